@@ -0,0 +1,68 @@
+import argparse
+import json
+import threading
+import time
+import uuid
+
+from client import ApiClient, percentile
+
+def probe_logins(client, email, password, stop, latencies):
+    # one login at a time while the bulk request runs: what an interactive user sees
+    while not stop.is_set():
+        status, _payload, elapsed = client.login(email, password)
+        if status == 200:
+            latencies.append(elapsed)
+
+def main():
+    parser = argparse.ArgumentParser(description="Provisioning time: one /sign-up/ per user vs /users/bulk/ (lab)")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--sample", type=int, default=100,
+                        help="sequential sign-ups timed for the baseline, extrapolated to --users")
+    parser.add_argument("--duplicates", type=int, default=100, help="rows in the bulk request that repeat an email")
+    parser.add_argument("--admin-email", default="bulk-admin@example.com", help="must be listed in the app's ADMIN_EMAILS")
+    parser.add_argument("--admin-password", default="admin-password")
+    args = parser.parse_args()
+
+    client = ApiClient(args.base_url, "lab", timeout=3600)
+    run = uuid.uuid4().hex[:8]
+    token = client.sign_up(args.admin_email, args.admin_password)
+    if token is None:
+        status, payload, _ = client.login(args.admin_email, args.admin_password)
+        if status != 200:
+            raise SystemExit("could not sign up or log in the admin user, is the lab app running?")
+        token = client.token_from(payload)
+
+    start = time.perf_counter()
+    for i in range(args.sample):
+        if client.sign_up(f"single-{run}-{i}@example.com", f"password-{i}") is None:
+            raise SystemExit(f"sign-up {i} failed")
+    per_user = (time.perf_counter() - start) / args.sample
+    print(f"sequential /sign-up/: {per_user * 1000:.1f} ms/user, ~{per_user * args.users:.1f} s for {args.users} users")
+
+    idle = []
+    for _ in range(5):
+        status, _payload, elapsed = client.login(f"single-{run}-0@example.com", "password-0")
+        idle.append(elapsed)
+
+    users = [{"email": f"bulk-{run}-{i}@example.com", "password": f"password-{i}"} for i in range(args.users)]
+    users += users[:args.duplicates]
+    stop = threading.Event()
+    logins = []
+    prober = threading.Thread(target=probe_logins, args=(client, f"single-{run}-0@example.com", "password-0", stop, logins))
+    prober.start()
+    try:
+        status, payload, elapsed = client.request("POST", "/users/bulk/", body={"users": users}, token=token)
+    finally:
+        stop.set()
+        prober.join()
+    if status != 200:
+        raise SystemExit(f"/users/bulk/ returned {status}: {payload[:200]!r}")
+    body = json.loads(payload)
+    print(f"/users/bulk/: {elapsed:.1f} s for {len(users)} rows, created={body['created']} "
+          f"duplicates={body['duplicates']} ({elapsed / (per_user * args.users):.1%} of the sequential estimate)")
+    print(f"login idle: p50={percentile(idle, 50) * 1000:.0f} ms; during bulk: n={len(logins)} "
+          f"p50={percentile(logins, 50) * 1000:.0f} ms p99={percentile(logins, 99) * 1000:.0f} ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import json
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+# route layout of the two apps: lab mounts everything under /api/v1 and uses an OAuth2 form login
+PREFIXES = {"lab": "/api/v1", "labb2": ""}
+
+class ApiClient:
+    def __init__(self, base_url: str, app: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.app = app
+        self.prefix = PREFIXES[app]
+        self.timeout = timeout
+
+    def request(self, method, path, body=None, form=None, token=None, headers=None):
+        headers = dict(headers or {})
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode()
+            headers["Content-Type"] = "application/json"
+        elif form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        req = urllib.request.Request(self.base_url + self.prefix + path, data=data, headers=headers, method=method)
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                status, payload = resp.status, resp.read()
+        except urllib.error.HTTPError as e:
+            status, payload = e.code, e.read()
+        except (urllib.error.URLError, OSError) as e:
+            status, payload = 0, str(e).encode()
+        return status, payload, time.perf_counter() - start
+
+    @staticmethod
+    def token_from(payload: bytes):
+        body = json.loads(payload)
+        token = body.get("token")
+        return token["access_token"] if isinstance(token, dict) else token
+
+    def sign_up(self, email, password):
+        status, payload, _ = self.request("POST", "/sign-up/", body={"email": email, "password": password})
+        return self.token_from(payload) if status == 200 else None
+
+    def login(self, email, password):
+        if self.app == "lab":
+            return self.request("POST", "/login/", form={"username": email, "password": password})
+        return self.request("POST", "/login/", body={"email": email, "password": password})
+
+    def encode(self, token, text, key, **options):
+        return self.request("POST", "/encode", body={"text": text, "key": key, **options}, token=token)
+
+    def decode(self, token, body):
+        return self.request("POST", "/decode", body=body, token=token)
+
+def percentile(values, q):
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
@@ -0,0 +1,51 @@
+import importlib.util
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_service(project: str, name: str):
+    # both projects ship their own top-level "app" package, so services are loaded by path
+    use_project(project)
+    path = os.path.join(ROOT, project, "app", "services", name + ".py")
+    spec = importlib.util.spec_from_file_location(f"{project}_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def add_project_path(project: str):
+    # for modules that import through the "app" package; only one project per process
+    path = os.path.join(ROOT, project)
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+def use_project(project: str):
+    # services import app.core.metrics, so point "app" at this project's tree,
+    # dropping modules already imported from the other one
+    path = os.path.join(ROOT, project)
+    if path in sys.path:
+        sys.path.remove(path)
+    sys.path.insert(0, path)
+    for module in [name for name in sys.modules if name == "app" or name.startswith("app.")]:
+        origin = getattr(sys.modules[module], "__file__", None) or next(iter(getattr(sys.modules[module], "__path__", [])), "")
+        if not origin.startswith(path + os.sep):
+            del sys.modules[module]
+
+def sample_text(size: int, alphabet: str = "abcdefghijklmnopqrstuvwxyz ,.", seed: int = 0) -> str:
+    rnd = random.Random(seed)
+    return "".join(rnd.choices(alphabet, k=size))
+
+def measure(func, *args, repeat: int = 3):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def mb_per_s(nbytes: int, seconds: float) -> float:
+    return nbytes / (1024 * 1024) / seconds if seconds else float("inf")
@@ -0,0 +1,72 @@
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import add_project_path
+
+def main():
+    parser = argparse.ArgumentParser(description="lab user lookups per second: default sync engine vs tuned sync vs async")
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="auth-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+    add_project_path("lab")
+
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from app.cruds.user import get_user_by_email, get_user_by_email_async
+    from app.db.base_class import Base
+    from app.db.session import AsyncSessionLocal, SessionLocal, async_engine, engine
+    from app.models.user import User
+
+    Base.metadata.create_all(bind=engine)
+    emails = [f"user{i}@example.com" for i in range(args.users)]
+    with SessionLocal() as db:
+        db.add_all(User(email=email, hashed_password="x") for email in emails)
+        db.commit()
+    rnd = random.Random(0)
+    targets = [rnd.choice(emails) for _ in range(args.lookups)]
+
+    def run_sync(session_factory):
+        def lookup(email):
+            with session_factory() as db:
+                return get_user_by_email(db, email) is not None
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            found = sum(pool.map(lookup, targets))
+        assert found == len(targets)
+        return len(targets) / (time.perf_counter() - start)
+
+    async def run_async():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def lookup(email):
+            async with semaphore:
+                async with AsyncSessionLocal() as db:
+                    return await get_user_by_email_async(db, email) is not None
+
+        start = time.perf_counter()
+        found = sum(await asyncio.gather(*(lookup(email) for email in targets)))
+        assert found == len(targets)
+        rate = len(targets) / (time.perf_counter() - start)
+        await async_engine.dispose()
+        return rate
+
+    default_engine = create_engine(os.environ["DATABASE_URL"], connect_args={"check_same_thread": False})
+    results = {
+        "sync, default engine": run_sync(sessionmaker(bind=default_engine)),
+        "sync, tuned engine": run_sync(SessionLocal),
+        "async, tuned engine": asyncio.run(run_async()),
+    }
+    for label, rate in results.items():
+        print(f"{label:>22}: {rate:10.0f} lookups/s  (concurrency {args.concurrency})")
+
+if __name__ == "__main__":
+    main()
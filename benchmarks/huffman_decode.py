@@ -0,0 +1,40 @@
+import argparse
+
+from common import load_service, measure, mb_per_s, sample_text
+
+def bitwise_decode(data, codes, padding):
+    # decoder used before the lookup tables, kept here as the baseline
+    inv_codes = {v: k for k, v in codes.items()}
+    bits = ''.join(f'{byte:08b}' for byte in data)
+    if padding:
+        bits = bits[:-padding]
+    res = []
+    code = ''
+    for bit in bits:
+        code += bit
+        if code in inv_codes:
+            res.append(inv_codes[code])
+            code = ''
+    return ''.join(res)
+
+def main():
+    parser = argparse.ArgumentParser(description="labb2 huffman_decode throughput")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 4_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    huffman = load_service("labb2", "huffman")
+    alphabet = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя abcdefghijklmnopqrstuvwxyz,.!?"
+    print(f"{'chars':>10} {'packed KB':>10} {'bitwise MB/s':>13} {'table MB/s':>11} {'speedup':>8}")
+    for size in args.sizes:
+        text = sample_text(size, alphabet)
+        data, codes, padding = huffman.huffman_encode(text)
+        old_time, old_text = measure(bitwise_decode, data, codes, padding, repeat=args.repeat)
+        new_time, new_text = measure(huffman.huffman_decode, data, codes, padding, repeat=args.repeat)
+        assert old_text == new_text == text
+        out_bytes = len(text.encode("utf-8"))
+        print(f"{size:>10} {len(data) / 1024:>10.1f} {mb_per_s(out_bytes, old_time):>13.2f} "
+              f"{mb_per_s(out_bytes, new_time):>11.2f} {old_time / new_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import argparse
+import io
+import os
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+import time
+
+from common import ROOT
+
+def run_import(project_dir: str, statement: str) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", statement], cwd=project_dir, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def import_profile(project_dir: str) -> list:
+    # -X importtime prints "self [us] | cumulative | imported package" after each
+    # import finishes, nested ones indented; "main" comes last, its imports just before it
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import main"], cwd=project_dir,
+                            check=True, capture_output=True, text=True)
+    entries = [line.split(":", 1)[1].split("|") for line in result.stderr.splitlines()
+               if line.startswith("import time:") and "imported package" not in line]
+    modules = []
+    for self_us, cumulative_us, name in reversed(entries[:-1]):
+        if not name.startswith("  "):
+            break
+        name = name.strip()
+        if "." not in name:
+            modules.append((name, int(self_us), int(cumulative_us)))
+    return modules
+
+def measure_project(label: str, project_dir: str, runs: int, top: int):
+    baseline = statistics.median(run_import(project_dir, "pass") for _ in range(runs))
+    total = statistics.median(run_import(project_dir, "import main") for _ in range(runs))
+    modules = import_profile(project_dir)
+    loaded = {name for name, _, _ in modules}
+    print(f"{label}: import main {1000 * (total - baseline):.0f} ms over a bare interpreter "
+          f"(median of {runs}), celery loaded: {'celery' in loaded}, redis loaded: {'redis' in loaded}")
+    for name, _, cumulative in sorted(modules, key=lambda m: -m[2])[:top]:
+        print(f"    {cumulative / 1000:8.1f} ms  {name}")
+
+def export_ref(ref: str, project: str, target: str) -> str:
+    # a clean copy of the project at another revision, without touching the working tree
+    archive = subprocess.run(["git", "archive", ref, project], cwd=ROOT, check=True, capture_output=True).stdout
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(target)
+    return os.path.join(target, project)
+
+def main():
+    parser = argparse.ArgumentParser(description="Import cost of main.py, optionally against another git revision")
+    parser.add_argument("--projects", nargs="+", choices=["lab", "labb2"], default=["lab", "labb2"])
+    parser.add_argument("--ref", help="git revision to compare with, e.g. HEAD~1")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="slowest top-level packages to list")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for project in args.projects:
+            if args.ref:
+                measure_project(f"{project}@{args.ref}", export_ref(args.ref, project, tmp), args.runs, args.top)
+            measure_project(f"{project}@working tree", os.path.join(ROOT, project), args.runs, args.top)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+import argparse
+import base64
+
+from common import load_service, measure, mb_per_s, sample_text
+
+def text_bits_roundtrip(huffman, xor, text, key):
+    encoded_text, codes, padding = huffman.huffman_encode(text)
+    encoded_data = base64.b64encode(xor.xor_encrypt(encoded_text, key))
+    bits = xor.xor_decrypt(base64.b64decode(encoded_data), key)
+    bits = bits[:-padding] if padding > 0 else bits
+    return encoded_data, huffman.decode_text(bits, codes)
+
+def packed_roundtrip(huffman, xor, text, key):
+    encoded_bytes, codes, padding = huffman.huffman_encode(text, packed=True)
+    encoded_data = base64.b64encode(xor.xor_encrypt(encoded_bytes, key))
+    data = xor.xor_bytes(base64.b64decode(encoded_data), key)
+    return encoded_data, huffman.decode_text(data, codes, padding)
+
+def main():
+    parser = argparse.ArgumentParser(description="lab /encode pipeline: '0'/'1' text vs packed bytes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--key", default="secret")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    huffman = load_service("lab", "huffman")
+    xor = load_service("lab", "xor")
+    print(f"{'chars':>8} {'input B':>9} {'text b64':>10} {'packed b64':>11} {'text MB/s':>10} {'packed MB/s':>12}")
+    for size in args.sizes:
+        text = sample_text(size)
+        nbytes = len(text.encode("utf-8"))
+        text_time, (text_data, text_out) = measure(text_bits_roundtrip, huffman, xor, text, args.key, repeat=args.repeat)
+        packed_time, (packed_data, packed_out) = measure(packed_roundtrip, huffman, xor, text, args.key, repeat=args.repeat)
+        assert text_out == packed_out == text
+        print(f"{size:>8} {nbytes:>9} {len(text_data):>10} {len(packed_data):>11} "
+              f"{mb_per_s(nbytes, text_time):>10.2f} {mb_per_s(nbytes, packed_time):>12.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from client import ApiClient, percentile
+from common import ROOT, add_project_path, sample_text
+
+SCENARIOS = ("login", "encode", "decode", "encode_async")
+DEFAULT_MIX = "login=1,encode=6,decode=3,encode_async=1"
+# metrics compared against the baseline; all are "smaller is better" except throughput
+COMPARED = ["p50_ms", "p95_ms", "p99_ms", "throughput", "error_rate"]
+
+def parse_mix(value: str, app: str):
+    mix = []
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in SCENARIOS:
+            raise SystemExit(f"unknown scenario {name!r}, expected one of {', '.join(SCENARIOS)}")
+        if name == "encode_async" and app == "lab":
+            print("lab has no /encode-async/, dropping that scenario", file=sys.stderr)
+            continue
+        mix.append((name, float(weight or 1)))
+    if not mix:
+        raise SystemExit("empty scenario mix")
+    return mix
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_for_port(port: int, timeout: float):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.5):
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit(f"server did not start listening on port {port} within {timeout:.0f} s")
+
+class Server:
+    # "subprocess" runs uvicorn next to the load generator, "inprocess" runs it on a
+    # thread here (handy under a profiler, but both then share one GIL)
+    def __init__(self, app: str, mode: str, port: int):
+        self.app = app
+        self.mode = mode
+        self.port = port
+        self.process = None
+        self.server = None
+        self.thread = None
+
+    def start(self, timeout: float = 30.0) -> str:
+        project = os.path.join(ROOT, self.app)
+        if self.mode == "subprocess":
+            self.process = subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+                 "--port", str(self.port), "--log-level", "warning"],
+                cwd=project,
+            )
+        else:
+            add_project_path(self.app)
+            os.chdir(project)
+            import uvicorn
+            self.server = uvicorn.Server(uvicorn.Config("main:app", host="127.0.0.1", port=self.port, log_level="warning"))
+            self.thread = threading.Thread(target=self.server.run, daemon=True)
+            self.thread.start()
+        wait_for_port(self.port, timeout)
+        return f"http://127.0.0.1:{self.port}"
+
+    def stop(self):
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+        if self.server is not None:
+            self.server.should_exit = True
+            self.thread.join(timeout=10)
+
+class Context:
+    def __init__(self, client, users, text, key, payload, poll_interval, task_timeout):
+        self.client = client
+        self.users = users
+        self.text = text
+        self.key = key
+        self.payload = payload
+        self.poll_interval = poll_interval
+        self.task_timeout = task_timeout
+
+def setup(client, user_count) -> list:
+    run = uuid.uuid4().hex[:8]
+    users = []
+    for i in range(user_count):
+        email, password = f"load-{run}-{i}@example.com", f"password-{i}"
+        token = client.sign_up(email, password)
+        if token is None:
+            raise SystemExit(f"could not register {email}")
+        users.append((email, password, token))
+    return users
+
+def encoded_payload(client, token, text, key) -> dict:
+    status, payload, _ = client.encode(token, text, key)
+    if status != 200:
+        raise SystemExit(f"/encode returned {status} during setup: {payload[:200]!r}")
+    # the /encode response doubles as a valid /decode request body
+    return json.loads(payload)
+
+def run_encode_async(ctx, token) -> int:
+    status, payload, _ = ctx.client.request("POST", "/encode-async/", body={"text": ctx.text, "key": ctx.key}, token=token)
+    if status != 200:
+        return status
+    task_id = json.loads(payload)["task_id"]
+    deadline = time.perf_counter() + ctx.task_timeout
+    while time.perf_counter() < deadline:
+        status, payload, _ = ctx.client.request("GET", f"/task-status/{task_id}", token=token)
+        if status != 200:
+            return status
+        state = json.loads(payload).get("status")
+        if state == "SUCCESS":
+            return 200
+        if state in ("FAILURE", "REVOKED"):
+            return 500
+        time.sleep(ctx.poll_interval)
+    return 504
+
+def run_scenario(name, ctx, rnd) -> int:
+    email, password, token = ctx.users[rnd.randrange(len(ctx.users))]
+    if name == "login":
+        return ctx.client.login(email, password)[0]
+    if name == "encode":
+        return ctx.client.encode(token, ctx.text, ctx.key)[0]
+    if name == "decode":
+        return ctx.client.decode(token, ctx.payload)[0]
+    return run_encode_async(ctx, token)
+
+def generate_load(ctx, mix, rps, duration, concurrency, seed):
+    # open loop: requests start on a fixed schedule and latency is measured from the
+    # scheduled time, so a stalled server shows up as latency instead of lower offered load
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    rnd = random.Random(seed)
+    samples = []
+    lock = threading.Lock()
+
+    def worker(name, scheduled, worker_seed):
+        status = run_scenario(name, ctx, random.Random(worker_seed))
+        elapsed = time.perf_counter() - scheduled
+        with lock:
+            samples.append((name, elapsed, status))
+
+    total = int(rps * duration)
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        for i in range(total):
+            scheduled = start + i / rps
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(worker, rnd.choices(names, weights)[0], scheduled, rnd.random())
+    return samples, time.perf_counter() - start
+
+def summarize(samples, elapsed) -> dict:
+    groups = {"all": samples}
+    for sample in samples:
+        groups.setdefault(sample[0], []).append(sample)
+    summary = {}
+    for name, group in groups.items():
+        ms = [latency * 1000 for _, latency, _ in group]
+        errors = sum(1 for _, _, status in group if not 200 <= status < 300)
+        summary[name] = {
+            "requests": len(group),
+            "errors": errors,
+            "error_rate": errors / len(group) if group else 0.0,
+            "throughput": len(group) / elapsed if elapsed else 0.0,
+            "p50_ms": percentile(ms, 50),
+            "p95_ms": percentile(ms, 95),
+            "p99_ms": percentile(ms, 99),
+        }
+    return summary
+
+def find_regressions(summary, baseline, threshold):
+    regressions = []
+    for name, record in summary.items():
+        old = baseline["summary"].get(name)
+        if old is None:
+            continue
+        for metric in COMPARED:
+            new_value, old_value = record.get(metric), old.get(metric)
+            if metric == "error_rate":
+                # absolute, a 0% baseline would make any relative change infinite
+                change = new_value - old_value
+            elif not new_value or not old_value:
+                continue
+            elif metric == "throughput":
+                change = (old_value - new_value) / old_value
+            else:
+                change = (new_value - old_value) / old_value
+            if change > threshold:
+                regressions.append({
+                    "scenario": name,
+                    "metric": metric,
+                    "baseline": old_value,
+                    "current": new_value,
+                    "change": change,
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Weighted-scenario load test for lab and labb2")
+    parser.add_argument("--app", choices=["lab", "labb2"], default="lab")
+    parser.add_argument("--mode", choices=["subprocess", "inprocess", "external"], default="subprocess",
+                        help="start the app with uvicorn here, or hit an already running --base-url")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="used with --mode external")
+    parser.add_argument("--port", type=int, default=0, help="port for a started server, 0 picks a free one")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="scenario=weight pairs")
+    parser.add_argument("--rps", type=float, default=50.0, help="target requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds of load")
+    parser.add_argument("--concurrency", type=int, default=64, help="client threads")
+    parser.add_argument("--users", type=int, default=10, help="users registered before the run")
+    parser.add_argument("--text-size", type=int, default=1024)
+    parser.add_argument("--key", default="correct horse battery staple")
+    parser.add_argument("--poll-interval", type=float, default=0.1, help="seconds between /task-status polls")
+    parser.add_argument("--task-timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the JSON report to this file")
+    parser.add_argument("--save-baseline", help="also write the report here for later --baseline runs")
+    parser.add_argument("--baseline", help="previous JSON report to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change flagged as a regression")
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix, args.app)
+    server = None
+    base_url = args.base_url
+    if args.mode != "external":
+        server = Server(args.app, args.mode, args.port or free_port())
+        base_url = server.start()
+    try:
+        client = ApiClient(base_url, args.app, timeout=args.task_timeout)
+        text = sample_text(args.text_size, seed=args.seed)
+        users = setup(client, args.users)
+        payload = encoded_payload(client, users[0][2], text, args.key)
+        ctx = Context(client, users, text, args.key, payload, args.poll_interval, args.task_timeout)
+        samples, elapsed = generate_load(ctx, mix, args.rps, args.duration, args.concurrency, args.seed)
+    finally:
+        if server is not None:
+            server.stop()
+
+    summary = summarize(samples, elapsed)
+    for name, record in summary.items():
+        print(f"{name:>13}: n={record['requests']:<6} {record['throughput']:7.1f} req/s  "
+              f"p50={record['p50_ms']:8.2f} ms  p95={record['p95_ms']:8.2f} ms  p99={record['p99_ms']:8.2f} ms  "
+              f"errors={record['error_rate']:.1%}", file=sys.stderr)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "config": {
+            "app": args.app, "mode": args.mode, "mix": dict(mix), "rps": args.rps, "duration": args.duration,
+            "concurrency": args.concurrency, "users": args.users, "text_size": args.text_size,
+        },
+        "elapsed": elapsed,
+        "summary": summary,
+    }
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("baseline was recorded with a different configuration", file=sys.stderr)
+        report["regressions"] = find_regressions(summary, baseline, args.threshold)
+        for item in report["regressions"]:
+            print(f"REGRESSION {item['scenario']}: {item['metric']} {item['baseline']:.4g} -> "
+                  f"{item['current']:.4g} ({item['change']:+.0%})", file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+    if not args.output:
+        json.dump(report, sys.stdout, indent=2)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+import argparse
+import threading
+import time
+import uuid
+from collections import Counter
+
+from client import ApiClient, percentile
+
+def probe_encode(client, token, seconds, text, key):
+    latencies = []
+    statuses = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        status, _payload, elapsed = client.encode(token, text, key)
+        statuses[status] += 1
+        latencies.append(elapsed)
+    return latencies, statuses
+
+def login_burst(client, email, password, stop, statuses, lock):
+    while not stop.is_set():
+        status, _payload, _elapsed = client.login(email, password)
+        with lock:
+            statuses[status] += 1
+
+def report(label, latencies, statuses):
+    ms = [x * 1000 for x in latencies]
+    print(f"{label:>14}: n={len(ms):<6} p50={percentile(ms, 50):8.2f} ms  p95={percentile(ms, 95):8.2f} ms  "
+          f"p99={percentile(ms, 99):8.2f} ms  statuses={dict(statuses)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="/encode latency with and without a concurrent login burst")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--app", choices=["lab", "labb2"], default="lab")
+    parser.add_argument("--burst-clients", type=int, default=64)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--text-size", type=int, default=256)
+    args = parser.parse_args()
+
+    client = ApiClient(args.base_url, args.app)
+    email = f"burst-{uuid.uuid4().hex[:8]}@example.com"
+    password = "burst-password"
+    token = client.sign_up(email, password)
+    if token is None:
+        raise SystemExit(f"sign-up failed against {args.base_url}")
+    text, key = "lorem ipsum dolor sit amet " * (args.text_size // 27 + 1), "secret"
+
+    report("idle", *probe_encode(client, token, args.seconds, text, key))
+
+    stop = threading.Event()
+    login_statuses = Counter()
+    lock = threading.Lock()
+    threads = [
+        threading.Thread(target=login_burst, args=(client, email, password, stop, login_statuses, lock), daemon=True)
+        for _ in range(args.burst_clients)
+    ]
+    for t in threads:
+        t.start()
+    try:
+        report("login burst", *probe_encode(client, token, args.seconds, text, key))
+    finally:
+        stop.set()
+        for t in threads:
+            t.join()
+    print(f"{'logins':>14}: {sum(login_statuses.values())} requests, statuses={dict(login_statuses)}")
+
+if __name__ == "__main__":
+    main()
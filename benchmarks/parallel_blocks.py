@@ -0,0 +1,38 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+from common import add_project_path, measure, mb_per_s, sample_text
+
+add_project_path("labb2")
+
+from app.services.blocks import decode_blocks, encode_blocks
+
+def main():
+    parser = argparse.ArgumentParser(description="labb2 block-framed encode/decode speedup per worker count")
+    parser.add_argument("--chars", type=int, default=8_000_000)
+    parser.add_argument("--block-chars", type=int, default=1 << 20)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--key", default="secret")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    text = sample_text(args.chars, "абвгдеёжзийклмнопрстуфхцчшщъыьэюя abcdefghijklmnopqrstuvwxyz,.")
+    nbytes = len(text.encode("utf-8"))
+    base = None
+    print(f"{'workers':>7} {'encode MB/s':>12} {'decode MB/s':>12} {'speedup':>8}")
+    for workers in args.workers:
+        executor = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+        if executor is not None:
+            # start the pool outside the timed region
+            list(executor.map(int, range(workers)))
+        enc_time, data = measure(encode_blocks, text, args.key, executor, args.block_chars, repeat=args.repeat)
+        dec_time, out = measure(decode_blocks, data, args.key, executor, repeat=args.repeat)
+        if executor is not None:
+            executor.shutdown()
+        assert out == text
+        total = enc_time + dec_time
+        base = base or total
+        print(f"{workers:>7} {mb_per_s(nbytes, enc_time):>12.2f} {mb_per_s(nbytes, dec_time):>12.2f} {base / total:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
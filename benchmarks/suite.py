@@ -0,0 +1,180 @@
+import argparse
+import base64
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+from common import load_service, measure, mb_per_s, sample_text
+
+ALPHABETS = {
+    "ascii": "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789 .,;:!?-'\"()\n",
+    "cyrillic": "абвгдеёжзийклмнопрстуфхцчшщъыьэюяАБВГДЕЖЗИЙКЛМНОПРСТУФХЦЧШЩЭЮЯ .,!?-\n",
+    "emoji": "😀😂🥲😍🤔👍🔥🎉🚀❤️✨🙏 abc .,",
+}
+
+# (larger is better) metrics compared against the baseline; everything else is "smaller is better"
+HIGHER_IS_BETTER = {"encode_mb_s", "decode_mb_s"}
+COMPARED = ["encode_mb_s", "decode_mb_s", "output_bytes", "peak_kb"]
+
+def lab_pipeline(packed: bool):
+    huffman = load_service("lab", "huffman")
+    xor = load_service("lab", "xor")
+
+    def encode(text, key):
+        encoded, codes, padding = huffman.huffman_encode(text, packed=packed)
+        return base64.b64encode(xor.xor_encrypt(encoded, key)), codes, padding
+
+    def decode(payload, key):
+        encoded_data, codes, padding = payload
+        data = base64.b64decode(encoded_data)
+        if packed:
+            return huffman.decode_text(xor.xor_bytes(data, key), codes, padding)
+        bits = xor.xor_decrypt(data, key)
+        return huffman.decode_text(bits[:-padding] if padding > 0 else bits, codes)
+
+    return encode, decode
+
+def labb2_pipeline(alphabet: str):
+    huffman = load_service("labb2", "huffman")
+    xor_cipher = load_service("labb2", "xor_cipher")
+
+    def encode(text, key):
+        if alphabet == "byte":
+            encoded, codes, padding = huffman.huffman_encode_bytes(text.encode())
+        else:
+            encoded, codes, padding = huffman.huffman_encode(text)
+        return base64.b64encode(xor_cipher.xor_encrypt(encoded, key)), codes, padding
+
+    def decode(payload, key):
+        encoded_data, codes, padding = payload
+        data = xor_cipher.xor_decrypt(base64.b64decode(encoded_data), key)
+        if alphabet == "byte":
+            return huffman.huffman_decode_bytes(data, codes, padding).decode()
+        return huffman.huffman_decode(data, codes, padding)
+
+    return encode, decode
+
+IMPLEMENTATIONS = {
+    "lab-text": (lambda: lab_pipeline(False), 1 << 20),
+    "lab-packed": (lambda: lab_pipeline(True), 10 << 20),
+    "labb2-char": (lambda: labb2_pipeline("char"), None),
+    "labb2-byte": (lambda: labb2_pipeline("byte"), None),
+}
+
+def peak_memory_kb(func, *args) -> float:
+    tracemalloc.start()
+    try:
+        func(*args)
+        return tracemalloc.get_traced_memory()[1] / 1024
+    finally:
+        tracemalloc.stop()
+
+def run_case(name, encode, decode, alphabet, size, key_len, repeat, memory):
+    text = sample_text(size, ALPHABETS[alphabet], seed=size)
+    key = ("k3y" * key_len)[:key_len]
+    nbytes = len(text.encode("utf-8"))
+    encode_s, payload = measure(encode, text, key, repeat=repeat)
+    decode_s, out = measure(decode, payload, key, repeat=repeat)
+    if out != text:
+        raise AssertionError(f"{name} round-trip mismatch ({alphabet}, {size})")
+    return {
+        "impl": name,
+        "alphabet": alphabet,
+        "chars": size,
+        "input_bytes": nbytes,
+        "key_len": key_len,
+        "encode_s": encode_s,
+        "decode_s": decode_s,
+        "encode_mb_s": mb_per_s(nbytes, encode_s),
+        "decode_mb_s": mb_per_s(nbytes, decode_s),
+        "output_bytes": len(payload[0]),
+        "peak_kb": peak_memory_kb(lambda: decode(encode(text, key), key)) if memory else None,
+    }
+
+def case_key(record):
+    return record["impl"], record["alphabet"], record["chars"], record["key_len"]
+
+def find_regressions(results, baseline, threshold):
+    previous = {case_key(r): r for r in baseline["results"]}
+    regressions = []
+    for record in results:
+        old = previous.get(case_key(record))
+        if old is None:
+            continue
+        for metric in COMPARED:
+            new_value, old_value = record.get(metric), old.get(metric)
+            if not new_value or not old_value:
+                continue
+            if metric in HIGHER_IS_BETTER:
+                change = (old_value - new_value) / old_value
+            else:
+                change = (new_value - old_value) / old_value
+            if change > threshold:
+                regressions.append({
+                    "case": dict(zip(("impl", "alphabet", "chars", "key_len"), case_key(record))),
+                    "metric": metric,
+                    "baseline": old_value,
+                    "current": new_value,
+                    "change": change,
+                })
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="lab vs labb2 Huffman/XOR benchmark suite")
+    parser.add_argument("--impls", nargs="+", default=list(IMPLEMENTATIONS), choices=list(IMPLEMENTATIONS))
+    parser.add_argument("--alphabets", nargs="+", default=list(ALPHABETS), choices=list(ALPHABETS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1 << 10, 100 << 10, 1 << 20],
+                        help="input sizes in characters, e.g. up to 104857600 for 100 MB")
+    parser.add_argument("--key-lens", type=int, nargs="+", default=[4, 64])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc peak-memory pass")
+    parser.add_argument("--all-sizes", action="store_true",
+                        help="also run the slow implementations above their default size limit")
+    parser.add_argument("--output", help="write JSON results to this file")
+    parser.add_argument("--baseline", help="previous JSON results to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15, help="relative change flagged as a regression")
+    args = parser.parse_args()
+
+    results = []
+    for name in args.impls:
+        factory, size_limit = IMPLEMENTATIONS[name]
+        encode, decode = factory()
+        for alphabet in args.alphabets:
+            for size in args.sizes:
+                if size_limit and size > size_limit and not args.all_sizes:
+                    continue
+                for key_len in args.key_lens:
+                    record = run_case(name, encode, decode, alphabet, size, key_len, args.repeat, not args.no_memory)
+                    results.append(record)
+                    peak = f"{record['peak_kb']:.0f}" if record["peak_kb"] is not None else "-"
+                    print(f"{name:>11} {alphabet:>8} {size:>10} key={key_len:<4} "
+                          f"enc {record['encode_mb_s']:8.2f} MB/s  dec {record['decode_mb_s']:8.2f} MB/s  "
+                          f"out {record['output_bytes']:>10} B  peak {peak:>8} KB", file=sys.stderr)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            report["regressions"] = find_regressions(results, json.load(f), args.threshold)
+        for item in report["regressions"]:
+            case = item["case"]
+            print(f"REGRESSION {case['impl']} {case['alphabet']} {case['chars']} key={case['key_len']}: "
+                  f"{item['metric']} {item['baseline']:.4g} -> {item['current']:.4g} ({item['change']:+.0%})",
+                  file=sys.stderr)
+        status = 1 if report["regressions"] else 0
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
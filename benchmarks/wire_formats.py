@@ -0,0 +1,115 @@
+import argparse
+import base64
+import json
+import time
+from urllib.parse import quote, unquote
+
+import orjson
+
+from common import load_service, sample_text
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+HEADER_SAFE = "".join(chr(c) for c in range(0x21, 0x7f) if chr(c) != "%")
+
+def header_name(field):
+    return "X-" + "-".join(part.capitalize() for part in field.split("_"))
+
+def json_format(dumps, loads):
+    def write(raw, meta):
+        return dumps({"encoded_data": base64.b64encode(raw).decode(), **meta}), {}
+
+    def read(body, headers):
+        fields = loads(body)
+        return base64.b64decode(fields.pop("encoded_data")), fields
+
+    return write, read
+
+def msgpack_format():
+    def write(raw, meta):
+        return msgpack.packb({"encoded_data": raw, **meta}), {}
+
+    def read(body, headers):
+        fields = msgpack.unpackb(body, raw=False)
+        return fields.pop("encoded_data"), fields
+
+    return write, read
+
+def octet_format():
+    # mirrors app/api/wire.py: payload as the body, metadata as X- headers
+    def write(raw, meta):
+        headers = {}
+        for name, value in meta.items():
+            if value is None:
+                continue
+            if isinstance(value, dict):
+                value = json.dumps(value, separators=(",", ":"))
+            elif isinstance(value, bool):
+                value = "true" if value else "false"
+            headers[header_name(name)] = quote(str(value), safe=HEADER_SAFE)
+        return raw, headers
+
+    def read(body, headers):
+        fields = {}
+        for name in ("key", "huffman_codes", "padding"):
+            value = headers.get(header_name(name))
+            if value is not None:
+                value = unquote(value)
+                fields[name] = json.loads(value) if name == "huffman_codes" else value
+        return body, fields
+
+    return write, read
+
+def stdlib_dumps(obj):
+    return json.dumps(obj).encode()
+
+FORMATS = {
+    "json": json_format(stdlib_dumps, json.loads),
+    "orjson": json_format(orjson.dumps, orjson.loads),
+    "octet": octet_format(),
+}
+if msgpack is not None:
+    FORMATS["msgpack"] = msgpack_format()
+
+def wire_size(body, headers):
+    return len(body) + sum(len(name) + len(value) + 4 for name, value in headers.items())
+
+def per_request(write, read, raw, meta, count):
+    start = time.process_time()
+    for _ in range(count):
+        body, headers = write(raw, meta)
+        read(body, headers)
+    return (time.process_time() - start) / count
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes on the wire and CPU per request for each /encode response format")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1 << 10, 64 << 10, 1 << 20])
+    parser.add_argument("--key", default="correct horse battery staple")
+    parser.add_argument("--canonical", action="store_true", help="ship code lengths in-band instead of the codes dict")
+    parser.add_argument("--budget", type=float, default=0.5, help="approximate CPU seconds per measurement")
+    args = parser.parse_args()
+
+    huffman = load_service("labb2", "huffman")
+    xor_cipher = load_service("labb2", "xor_cipher")
+    if msgpack is None:
+        print("msgpack not installed, skipping that format")
+
+    print(f"{'bytes':>9} {'format':>8} {'wire bytes':>11} {'overhead':>9} {'us/request':>11}")
+    for size in args.sizes:
+        text = sample_text(size)
+        encoded, codes, padding = huffman.huffman_encode(text, canonical=args.canonical)
+        raw = xor_cipher.xor_encrypt(encoded, args.key)
+        meta = {"key": args.key, "huffman_codes": None if args.canonical else codes, "padding": padding}
+        for name, (write, read) in FORMATS.items():
+            decoded, _fields = read(*write(raw, meta))
+            assert decoded == raw
+            count = max(1, int(args.budget / max(per_request(write, read, raw, meta, 1), 1e-6)))
+            cpu = per_request(write, read, raw, meta, count)
+            wire = wire_size(*write(raw, meta))
+            print(f"{size:>9} {name:>8} {wire:>11} {wire / len(raw) - 1:>8.1%} {cpu * 1e6:>11.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+import argparse
+import base64
+import time
+
+from common import add_project_path, load_service, mb_per_s, measure, sample_text
+
+def inline(sizes, chunk_sizes, key, repeat):
+    # the task body without a broker: chunked encode/decode with a progress callback
+    blocks = load_service("labb2", "blocks")
+    from app.celery.progress import ProgressReporter
+    print(f"{'bytes':>9} {'chunk':>8} {'updates':>8} {'writes':>7} {'encode MB/s':>12} {'decode MB/s':>12} {'one-shot MB/s':>14}")
+    for size in sizes:
+        text = sample_text(size)
+        one_shot, _ = measure(blocks.encode_blocks, text, key, None, size or 1, repeat=repeat)
+        for chunk in chunk_sizes:
+            encode_s, data = measure(blocks.encode_blocks_progress, text, key, lambda done, total: None, chunk, repeat=repeat)
+            decode_s, decoded = measure(blocks.decode_blocks_progress, data, key, lambda done, total: None, repeat=repeat)
+            # backend writes a task would make: one per chunk before, through the reporter now
+            reporter = ProgressReporter(lambda state, meta: None, lambda message: None, "encode", "bench")
+            reporter.start()
+            blocks.encode_blocks_progress(text, key, reporter.progress, chunk)
+            assert decoded == text
+            stats = reporter.stats()
+            print(f"{size:>9} {chunk:>8} {stats['reported'] + 1:>8} {stats['writes']:>7} {mb_per_s(size, encode_s):>12.1f} "
+                  f"{mb_per_s(size, decode_s):>12.1f} {mb_per_s(size, one_shot):>14.1f}")
+
+def payload(result: dict, field: str) -> bytes:
+    # large results are spilled to the blob store the workers share with us
+    from app.core.blob_store import blob_store
+    if result.get("blob") is None:
+        value = result[field]
+        return base64.b64decode(value) if field == "encoded_data" else value.encode()
+    path, _size = blob_store.open(result["blob"]["id"])
+    with open(path, "rb") as f:
+        return f.read()
+
+def through_celery(size, jobs, key, timeout):
+    # needs a broker and at least one running worker: celery -A app.celery.config worker
+    add_project_path("labb2")
+    from app.celery.tasks import encode_task
+    text = sample_text(size)
+    start = time.perf_counter()
+    results = [encode_task.apply_async(args=("encode", text, key), kwargs={"blocks": True}) for _ in range(jobs)]
+    encoded = [result.get(timeout=timeout)["result"] for result in results]
+    encode_s = time.perf_counter() - start
+    start = time.perf_counter()
+    results = [encode_task.apply_async(args=("decode", None, key, base64.b64encode(payload(item, "encoded_data")).decode(), None, 0),
+                                       kwargs={"blocks": True})
+               for item in encoded]
+    decoded = [payload(result.get(timeout=timeout)["result"], "decoded_text").decode() for result in results]
+    decode_s = time.perf_counter() - start
+    assert all(item == text for item in decoded)
+    for name, seconds in (("encode", encode_s), ("decode", decode_s)):
+        print(f"{name}: {jobs} jobs of {size} bytes in {seconds:.2f} s, {jobs / seconds:.1f} jobs/s, "
+              f"{mb_per_s(size * jobs, seconds):.1f} MB/s")
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput of the chunked Celery encode/decode task")
+    parser.add_argument("--mode", choices=["inline", "celery"], default="inline",
+                        help="run the task body here, or submit jobs to running workers")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1 << 20, 8 << 20])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[1 << 16, 1 << 18, 1 << 20])
+    parser.add_argument("--jobs", type=int, default=16, help="jobs per operation with --mode celery")
+    parser.add_argument("--key", default="correct horse battery staple")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    if args.mode == "inline":
+        inline(args.sizes, args.chunks, args.key, args.repeat)
+    else:
+        for size in args.sizes:
+            through_celery(size, args.jobs, args.key, args.timeout)
+
+if __name__ == "__main__":
+    main()
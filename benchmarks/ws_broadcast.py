@@ -0,0 +1,95 @@
+import argparse
+import asyncio
+import json
+import time
+
+from common import add_project_path
+
+class FakeSocket:
+    # stands in for a starlette WebSocket; "slow" ones take delay seconds per frame
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.received = 0
+        self.last = None
+        self.close_code = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+        self.last = text
+
+    async def close(self, code: int = 1000):
+        self.close_code = code
+
+def progress_messages(task_id: str, count: int):
+    yield {"status": "STARTED", "task_id": task_id, "operation": "encode"}
+    for i in range(count):
+        yield {"status": "PROGRESS", "task_id": task_id, "operation": "encode", "progress": 100 * (i + 1) // count}
+    yield {"status": "COMPLETED", "task_id": task_id, "operation": "encode", "result": {"padding": 0}}
+
+async def inline_broadcast(sockets, messages):
+    # the old behaviour: one awaited send per socket per message
+    for message in messages:
+        for socket in sockets:
+            await socket.send_text(json.dumps(message))
+
+async def run(args):
+    add_project_path("labb2")
+    from app.websocket.manager import ConnectionManager
+
+    slow = int(args.sockets * args.slow_fraction)
+    sockets = [FakeSocket(args.slow_delay if i < slow else 0) for i in range(args.sockets)]
+    messages = list(progress_messages("bench", args.messages))
+    expected = len(messages) * len(sockets)
+
+    if args.inline:
+        start = time.perf_counter()
+        await inline_broadcast(sockets, messages)
+        elapsed = time.perf_counter() - start
+        print(f"inline: {len(messages)} messages to {len(sockets)} sockets ({slow} slow) in {elapsed:.3f} s, "
+              f"{expected / elapsed:,.0f} frames/s")
+        return
+
+    manager = ConnectionManager(queue_size=args.queue_size)
+    for socket in sockets:
+        await manager.connect("bench", socket)
+    start = time.perf_counter()
+    publish = 0.0
+    for message in messages:
+        before = time.perf_counter()
+        await manager.send_json("bench", message)
+        publish = max(publish, time.perf_counter() - before)
+        await asyncio.sleep(args.interval)
+    # progress updates may be coalesced, the final state never is
+    final = json.dumps(messages[-1])
+    while any(socket.last != final for socket in sockets[slow:]):
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    delivered = sum(socket.received for socket in sockets)
+    still_open = sum(1 for socket in sockets[:slow] if socket.received and socket.close_code is None)
+    stats = manager.stats()
+    print(f"queued: {len(messages)} messages to {len(sockets)} sockets ({slow} slow) in {elapsed:.3f} s, "
+          f"{delivered / elapsed:,.0f} frames/s, slowest send_json {publish * 1000:.2f} ms")
+    print(f"        delivered {delivered}/{expected}, coalesced {stats['coalesced']}, dropped {stats['dropped']}, "
+          f"slow sockets still open {still_open}, slow disconnects {stats['slow_disconnects']}")
+    for connections in list(manager.active_connections.values()):
+        for connection in list(connections):
+            manager.disconnect("bench", connection)
+
+def main():
+    parser = argparse.ArgumentParser(description="Broadcast throughput of ConnectionManager to many sockets")
+    parser.add_argument("--sockets", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=100, help="progress updates between STARTED and COMPLETED")
+    parser.add_argument("--slow-fraction", type=float, default=0.01)
+    parser.add_argument("--slow-delay", type=float, default=0.05, help="seconds per frame for slow sockets")
+    parser.add_argument("--interval", type=float, default=0.0, help="seconds between published messages")
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--inline", action="store_true", help="await every send in turn, as before")
+    asyncio.run(run(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import argparse
+import os
+
+from common import load_service, measure, mb_per_s
+
+def labb2_baseline(data, key):
+    key_bytes = key.encode()
+    return bytes([b ^ key_bytes[i % len(key_bytes)] for i, b in enumerate(data)])
+
+def lab_baseline(data, key):
+    key_bytes = key.encode('utf-8')
+    repeated_key = (key_bytes * (len(data) // len(key_bytes) + 1))[:len(data)]
+    return bytes(a ^ b for a, b in zip(data, repeated_key))
+
+def main():
+    parser = argparse.ArgumentParser(description="XOR throughput: per-byte loops vs block engine")
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1 << 10, 100 << 10, 1 << 20, 10 << 20, 100 << 20])
+    parser.add_argument("--key", default="correct horse battery staple")
+    parser.add_argument("--baseline-max", type=int, default=10 << 20,
+                        help="skip the per-byte baselines above this size")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    xor_cipher = load_service("labb2", "xor_cipher")
+    xor = load_service("lab", "xor")
+    cases = [
+        ("labb2", labb2_baseline, xor_cipher.xor_encrypt),
+        ("lab", lab_baseline, xor.xor_bytes),
+    ]
+    print(f"{'impl':>6} {'bytes':>11} {'loop MB/s':>10} {'block MB/s':>11} {'speedup':>8}")
+    for size in args.sizes:
+        data = os.urandom(size)
+        for name, baseline, engine in cases:
+            new_time, new_out = measure(engine, data, args.key, repeat=args.repeat)
+            if size <= args.baseline_max:
+                old_time, old_out = measure(baseline, data, args.key, repeat=1)
+                assert old_out == new_out
+                old_rate = f"{mb_per_s(size, old_time):10.1f}"
+                speedup = f"{old_time / new_time:7.1f}x"
+            else:
+                old_rate, speedup = f"{'-':>10}", f"{'-':>8}"
+            print(f"{name:>6} {size:>11} {old_rate} {mb_per_s(size, new_time):>11.1f} {speedup}")
+
+if __name__ == "__main__":
+    main()
@@ -1,42 +1,69 @@
+import time
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.auth_cache import principal_cache
 from app.core.config import settings
-from app.core.security import verify_password
-from app.cruds.user import get_user_by_email
-from app.db.session import get_db
+from app.core.metrics import stage
+from app.cruds.user import get_user_by_email_async
+from app.db.session import get_async_db
 from app.schemas.user import TokenData, User
-from app.models.user import User as UserModel
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/login/")
 
+async def lookup_user(db: AsyncSession, token: str) -> Optional[User]:
+    # Raises JWTError for a bad token, returns None if the user does not exist
+    start = time.perf_counter()
+    user = principal_cache.get(token)
+    if user is not None:
+        principal_cache.record_lookup(True, time.perf_counter() - start)
+        return user
+    
+    # Decode JWT token
+    payload = jwt.decode(
+        token,
+        settings.SECRET_KEY,
+        algorithms=[settings.ALGORITHM]
+    )
+    email: str = payload.get("sub")
+    if email is None:
+        raise JWTError("Token has no subject")
+    token_data = TokenData(email=email)
+    
+    # Get user from database
+    db_user = await get_user_by_email_async(db, email=token_data.email)
+    if db_user is None:
+        return None
+    
+    # Cache a detached snapshot, not the session-bound model
+    user = User.model_validate(db_user)
+    principal_cache.put(token, user, payload.get("exp"))
+    principal_cache.record_lookup(False, time.perf_counter() - start)
+    return user
+
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
     token: str = Depends(oauth2_scheme)
-) -> UserModel:
+) -> User:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        # Decode JWT token
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise credentials_exception
-        token_data = TokenData(email=email)
+        with stage("auth"):
+            user = await lookup_user(db, token)
     except JWTError:
         raise credentials_exception
     
-    # Get user from database
-    user = get_user_by_email(db, email=token_data.email)
     if user is None:
         raise credentials_exception
     
-    return user 
\ No newline at end of file
+    return user
+
+async def get_current_admin(user: User = Depends(get_current_user)) -> User:
+    if user.email not in settings.ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Admin access required")
+    return user
@@ -1,27 +1,30 @@
 from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.config import settings
-from app.core.security import create_access_token, verify_password
-from app.cruds.user import get_user_by_email
-from app.db.session import get_db
-from app.schemas.user import Token, UserCreate, User, UserWithToken
-from app.cruds.user import create_user
-from app.api.deps import get_current_user
+from app.core.security import create_access_token, get_password_hash_async, get_password_hashes_async, verify_password_async
+from app.cruds.user import get_user_by_email_async, create_user_async, get_existing_emails_async, create_users_bulk_async
+from app.db.session import get_async_db
+from app.schemas.user import Token, UserCreate, User, UserWithToken, UserBulkCreate, UserBulkRow, UserBulkResult
+from app.api.deps import get_current_admin, get_current_user, lookup_user
+from app.core.auth_cache import principal_cache
 from typing import Optional
-from jose import jwt, JWTError
+from jose import JWTError
 
 router = APIRouter()
 
 @router.post("/sign-up/", response_model=UserWithToken)
-def sign_up(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, email=user.email)
+async def sign_up(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user_by_email_async(db, email=user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
     
+    # Hash on the dedicated pool so a sign-up burst cannot take every request thread
+    hashed_password = await get_password_hash_async(user.password)
+    
     # Create user
-    created_user = create_user(db=db, user=user)
+    created_user = await create_user_async(db, user=user, hashed_password=hashed_password)
     
     # Generate access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -37,13 +40,67 @@ def sign_up(user: UserCreate, db: Session = Depends(get_db)):
         token=Token(access_token=access_token, token_type="bearer")
     )
 
+@router.post("/users/bulk/", response_model=UserBulkResult)
+async def bulk_sign_up(
+    request: UserBulkCreate,
+    db: AsyncSession = Depends(get_async_db),
+    current_user: User = Depends(get_current_admin)
+):
+    users = request.users
+    if len(users) > settings.BULK_USERS_MAX:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Too many users: {len(users)}, max {settings.BULK_USERS_MAX}"
+        )
+    
+    # Rows that will be rejected anyway are sorted out before paying for bcrypt
+    existing = await get_existing_emails_async(db, list({user.email for user in users}))
+    # Hand the connection back while bcrypt runs
+    await db.close()
+    results = [None] * len(users)
+    first_row = {}
+    pending = []
+    for row, user in enumerate(users):
+        if user.email in existing:
+            results[row] = UserBulkRow(email=user.email, status="duplicate", detail="Email already registered")
+        elif user.email in first_row:
+            results[row] = UserBulkRow(
+                email=user.email, status="duplicate", detail=f"Same email as row {first_row[user.email]}"
+            )
+        else:
+            first_row[user.email] = row
+            pending.append((row, user))
+    
+    # Hash and insert one batch at a time, so the connection is only held for the inserts
+    ids = {}
+    for start in range(0, len(pending), settings.BULK_INSERT_BATCH):
+        batch = [user for _, user in pending[start:start + settings.BULK_INSERT_BATCH]]
+        hashed_passwords = await get_password_hashes_async([user.password for user in batch])
+        ids.update(await create_users_bulk_async(
+            db,
+            [(user.email, hashed) for user, hashed in zip(batch, hashed_passwords)],
+            settings.BULK_INSERT_BATCH
+        ))
+        await db.close()
+    
+    created = 0
+    for row, user in pending:
+        user_id = ids.get(user.email)
+        if user_id is None:
+            results[row] = UserBulkRow(email=user.email, status="duplicate", detail="Email already registered")
+        else:
+            results[row] = UserBulkRow(email=user.email, status="created", id=user_id)
+            created += 1
+    
+    return UserBulkResult(created=created, duplicates=len(users) - created, results=results)
+
 @router.post("/login/", response_model=UserWithToken)
-def login(
+async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    user = get_user_by_email(db, email=form_data.username)
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await get_user_by_email_async(db, email=form_data.username)
+    if not user or not await verify_password_async(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -62,9 +119,9 @@ def login(
     )
 
 @router.get("/users/me/", response_model=User)
-def read_users_me(
+async def read_users_me(
     authorization: Optional[str] = Header(None),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     if not authorization or not authorization.startswith("Bearer "):
         raise HTTPException(
@@ -75,33 +132,23 @@ def read_users_me(
     
     token = authorization.split(" ")[1]
     try:
-        # Decode JWT token
-        payload = jwt.decode(
-            token,
-            settings.SECRET_KEY,
-            algorithms=[settings.ALGORITHM]
-        )
-        email: str = payload.get("sub")
-        if email is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Invalid token",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        # Get user from database
-        user = get_user_by_email(db, email=email)
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="User not found",
-                headers={"WWW-Authenticate": "Bearer"},
-            )
-        
-        return user
+        user = await lookup_user(db, token)
     except JWTError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid token",
             headers={"WWW-Authenticate": "Bearer"},
-        ) 
\ No newline at end of file
+        )
+    
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    
+    return user
+
+@router.get("/auth-cache/stats/")
+def read_auth_cache_stats(current_user: User = Depends(get_current_user)):
+    return principal_cache.stats()
@@ -1,67 +1,194 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from pydantic import BaseModel
+from typing import List, Optional, Tuple
 import base64
-from app.services.huffman import huffman_encode, decode_text
-from app.services.xor import xor_encrypt, xor_decrypt
+from app.core.config import settings
+from app.services.huffman import huffman_encode, read_header_bits, unpack_code_lengths
+from app.services.huffman import decode_text as huffman_decode_text
+from app.services.xor import xor_encrypt, xor_decrypt, xor_bytes
+from app.services.codec_pool import codec_pool
 from app.api.deps import get_current_user
+from app.api.wire import read_request, binary_response, text_response, entity_tag, not_modified
+from app.core.result_cache import result_cache, result_key
 
 router = APIRouter()
 
 class EncodeRequest(BaseModel):
     text: str
     key: str
+    canonical: bool = False
+    packed: bool = False
 
 class EncodeResponse(BaseModel):
     encoded_data: str
     key: str
-    huffman_codes: dict
+    huffman_codes: Optional[dict] = None
     padding: int
+    packed: bool = False
 
 class DecodeRequest(BaseModel):
     encoded_data: str
     key: str
-    huffman_codes: dict
+    huffman_codes: Optional[dict] = None
     padding: int
+    packed: bool = False
 
 class DecodeResponse(BaseModel):
     decoded_text: str
 
-@router.post("/encode", response_model=EncodeResponse)
-def encode_text(request: EncodeRequest, current_user = Depends(get_current_user)):
-    try:
-        # First, apply Huffman encoding
-        encoded_text, huffman_codes, padding = huffman_encode(request.text)
-        
-        # Then, apply XOR encryption
-        encrypted_bytes = xor_encrypt(encoded_text, request.key)
-        
-        # Convert to base64 for safe transmission
-        encoded_data = base64.b64encode(encrypted_bytes).decode('utf-8')
-        
-        return EncodeResponse(
-            encoded_data=encoded_data,
-            key=request.key,
-            huffman_codes=huffman_codes,
-            padding=padding
+class EncodeBatchRequest(BaseModel):
+    items: List[EncodeRequest]
+
+class EncodeBatchItem(BaseModel):
+    result: Optional[EncodeResponse] = None
+    error: Optional[str] = None
+
+class EncodeBatchResponse(BaseModel):
+    results: List[EncodeBatchItem]
+
+class DecodeBatchRequest(BaseModel):
+    items: List[DecodeRequest]
+
+class DecodeBatchItem(BaseModel):
+    result: Optional[DecodeResponse] = None
+    error: Optional[str] = None
+
+class DecodeBatchResponse(BaseModel):
+    results: List[DecodeBatchItem]
+
+def encode_raw(request: EncodeRequest, code_tables: Optional[dict] = None) -> Tuple[bytes, dict]:
+    # First, apply Huffman encoding
+    encoded_text, huffman_codes, padding = huffman_encode(
+        request.text, canonical=request.canonical, packed=request.packed, code_tables=code_tables
+    )
+    
+    # Then, apply XOR encryption, in place on the packed buffer
+    encrypted_bytes = xor_encrypt(encoded_text, request.key)
+    
+    # The key is left out so cached results never hold it; the one copy of the
+    # payload is here, the cache and the response need immutable bytes
+    return bytes(encrypted_bytes), {
+        "huffman_codes": None if request.canonical else huffman_codes,
+        "padding": padding,
+        "packed": request.packed
+    }
+
+def encode_one(request: EncodeRequest, code_tables: Optional[dict] = None) -> EncodeResponse:
+    encrypted_bytes, meta = encode_raw(request, code_tables)
+    
+    # Convert to base64 for safe transmission
+    encoded_data = base64.b64encode(encrypted_bytes).decode('utf-8')
+    
+    return EncodeResponse(encoded_data=encoded_data, key=request.key, **meta)
+
+def decode_raw(request: DecodeRequest, encrypted_bytes: bytes) -> str:
+    if request.packed:
+        # Packed mode: XOR and Huffman work on the bytes directly
+        encoded_bytes = xor_bytes(encrypted_bytes, request.key)
+        huffman_codes = request.huffman_codes
+        if huffman_codes is None:
+            huffman_codes, offset = unpack_code_lengths(encoded_bytes)
+            encoded_bytes = encoded_bytes[offset:]
+        decoded_text = huffman_decode_text(encoded_bytes, huffman_codes, request.padding)
+        return decoded_text
+    
+    # Apply XOR decryption
+    encoded_text = xor_decrypt(encrypted_bytes, request.key)
+    
+    # Remove padding
+    encoded_text = encoded_text[:-request.padding] if request.padding > 0 else encoded_text
+    
+    # Canonical mode carries the code lengths in a header instead of the dict
+    huffman_codes = request.huffman_codes
+    if huffman_codes is None:
+        huffman_codes, encoded_text = read_header_bits(encoded_text)
+    
+    # Apply Huffman decoding
+    decoded_text = huffman_decode_text(encoded_text, huffman_codes)
+    
+    return decoded_text
+
+def decode_one(request: DecodeRequest) -> DecodeResponse:
+    # Convert from base64
+    encrypted_bytes = base64.b64decode(request.encoded_data)
+    return DecodeResponse(decoded_text=decode_raw(request, encrypted_bytes))
+
+def encode_items(items: List[EncodeRequest]) -> List[EncodeBatchItem]:
+    # Items with the same character histogram reuse one built code table
+    code_tables = {}
+    results = []
+    for item in items:
+        try:
+            results.append(EncodeBatchItem(result=encode_one(item, code_tables)))
+        except Exception as e:
+            results.append(EncodeBatchItem(error=str(e)))
+    return results
+
+def decode_items(items: List[DecodeRequest]) -> List[DecodeBatchItem]:
+    results = []
+    for item in items:
+        try:
+            results.append(DecodeBatchItem(result=decode_one(item)))
+        except Exception as e:
+            results.append(DecodeBatchItem(error=str(e)))
+    return results
+
+def check_batch_size(items: list):
+    if len(items) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch too large: {len(items)} items, max {settings.BATCH_MAX_ITEMS}"
         )
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
+
+# Handlers hand the CPU-bound codec work to codec_pool, which keeps trivial
+# payloads inline and sends the rest to worker processes. /encode and
+# /decode negotiate the wire format: JSON (base64 payload), msgpack (raw
+# bytes) or octet-stream (raw body, other fields in X- headers)
+@router.post("/encode", response_model=EncodeResponse)
+async def encode_text(http_request: Request, current_user = Depends(get_current_user)):
+    request, _ = await read_request(http_request, EncodeRequest, "text")
+    
+    # Encoding is deterministic, so identical inputs share one cached result
+    # and clients holding its ETag can skip the transfer
+    digest = result_key(request.text, request.key, request.canonical, request.packed)
+    etag = entity_tag(http_request, digest)
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if not_modified(http_request, etag):
+        result_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    
+    cached = await result_cache.lookup(digest)
+    if cached is not None:
+        encrypted_bytes, meta = cached
+    else:
+        try:
+            encrypted_bytes, meta = await codec_pool.run(len(request.text), encode_raw, request)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        await result_cache.store(digest, encrypted_bytes, meta)
+    return binary_response(http_request, "encoded_data", encrypted_bytes, {"key": request.key, **meta}, headers)
 
 @router.post("/decode", response_model=DecodeResponse)
-def decode_text(request: DecodeRequest, current_user = Depends(get_current_user)):
+async def decode_text(http_request: Request, current_user = Depends(get_current_user)):
+    request, encrypted_bytes = await read_request(http_request, DecodeRequest, "encoded_data", binary=True)
     try:
-        # Convert from base64
-        encrypted_bytes = base64.b64decode(request.encoded_data)
-        
-        # Apply XOR decryption
-        encoded_text = xor_decrypt(encrypted_bytes, request.key)
-        
-        # Remove padding
-        encoded_text = encoded_text[:-request.padding] if request.padding > 0 else encoded_text
-        
-        # Apply Huffman decoding
-        decoded_text = decode_text(encoded_text, request.huffman_codes)
-        
-        return DecodeResponse(decoded_text=decoded_text)
+        decoded_text = await codec_pool.run(len(encrypted_bytes), decode_raw, request, encrypted_bytes)
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+    return text_response(http_request, "decoded_text", decoded_text)
+
+@router.get("/result-cache/stats/")
+def read_result_cache_stats(current_user = Depends(get_current_user)):
+    return result_cache.stats()
+
+@router.post("/encode-batch", response_model=EncodeBatchResponse)
+async def encode_batch(request: EncodeBatchRequest, current_user = Depends(get_current_user)):
+    check_batch_size(request.items)
+    size = sum(len(item.text) for item in request.items)
+    return EncodeBatchResponse(results=await codec_pool.run(size, encode_items, request.items))
+
+@router.post("/decode-batch", response_model=DecodeBatchResponse)
+async def decode_batch(request: DecodeBatchRequest, current_user = Depends(get_current_user)):
+    check_batch_size(request.items)
+    size = sum(len(item.encoded_data) for item in request.items)
+    return DecodeBatchResponse(results=await codec_pool.run(size, decode_items, request.items))
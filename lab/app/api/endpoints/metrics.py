@@ -0,0 +1,11 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse
+from app.core.metrics import METRICS_ENABLED, render
+
+router = APIRouter()
+
+@router.get("/metrics", response_class=PlainTextResponse)
+def read_metrics():
+    if not METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Metrics are disabled, set METRICS_ENABLED=true")
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
@@ -14,7 +14,39 @@ class Settings(BaseModel):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     
+    HASH_WORKERS: int = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+    HASH_MAX_QUEUE: int = int(os.getenv("HASH_MAX_QUEUE", "32"))
+    BULK_HASH_WORKERS: int = int(os.getenv("BULK_HASH_WORKERS", str(os.cpu_count() or 1)))
+    BULK_YIELD_TO_LOGINS: bool = os.getenv("BULK_YIELD_TO_LOGINS", "false").lower() in ("1", "true", "yes")
+    BULK_USERS_MAX: int = int(os.getenv("BULK_USERS_MAX", "20000"))
+    BULK_INSERT_BATCH: int = int(os.getenv("BULK_INSERT_BATCH", "200"))
+    ADMIN_EMAILS: list[str] = [email.strip() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()]
+    
+    AUTH_CACHE_SIZE: int = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+    AUTH_CACHE_TTL_SECONDS: float = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+    
+    CODEC_WORKERS: int = int(os.getenv("CODEC_WORKERS", str(os.cpu_count() or 1)))
+    CODEC_INLINE_MAX_BYTES: int = int(os.getenv("CODEC_INLINE_MAX_BYTES", "1024"))
+    
+    RESULT_CACHE_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+    RESULT_CACHE_MAX_ITEM_BYTES: int = int(os.getenv("RESULT_CACHE_MAX_ITEM_BYTES", str(4 * 1024 * 1024)))
+    RESULT_CACHE_DIR: str = os.getenv("RESULT_CACHE_DIR", "")
+    RESULT_CACHE_DISK_MAX_BYTES: int = int(os.getenv("RESULT_CACHE_DISK_MAX_BYTES", str(1024 * 1024 * 1024)))
+    
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "false").lower() in ("1", "true", "yes")
+    
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "10000"))
+    
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./sql_app.db")
+    ASYNC_DATABASE_URL: str = os.getenv(
+        "ASYNC_DATABASE_URL",
+        DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+    )
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
     
     REDIS_HOST: str = os.getenv("REDIS_HOST", "localhost")
     REDIS_PORT: int = int(os.getenv("REDIS_PORT", "6379"))
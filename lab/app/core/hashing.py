@@ -0,0 +1,65 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.core.config import settings
+
+class HashingOverloaded(Exception):
+    pass
+
+class HashingPool:
+    # Dedicated threads for bcrypt, with a cap on running + queued jobs
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.rejected = 0
+        self.active = 0
+        self.last_done = 0.0
+
+    async def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            # Reject right away instead of queueing behind hundreds of ms of hashing
+            self.rejected += 1
+            raise HashingOverloaded("Password hashing queue is full")
+        self.active += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.active -= 1
+            self.last_done = time.monotonic()
+            self.slots.release()
+
+class BulkHashingPool:
+    # Separate threads for bulk provisioning, so an import never takes the
+    # login pool's queue slots. With yield_to_logins, items are hashed a window
+    # at a time and each window first waits, up to max_wait_seconds, for logins
+    # to go idle: logins get most of the CPU and the import runs slower
+    def __init__(self, workers: int, interactive: HashingPool, yield_to_logins: bool = False,
+                 idle_seconds: float = 0.05, max_wait_seconds: float = 1.0):
+        self.workers = workers
+        self.interactive = interactive
+        self.yield_to_logins = yield_to_logins
+        self.idle_seconds = idle_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash-bulk")
+
+    def logins_busy(self) -> bool:
+        return self.interactive.active > 0 or time.monotonic() - self.interactive.last_done < self.idle_seconds
+
+    async def map(self, func, items: list) -> list:
+        loop = asyncio.get_running_loop()
+        if not self.yield_to_logins:
+            return list(await asyncio.gather(*(loop.run_in_executor(self.executor, func, item) for item in items)))
+        results = []
+        for start in range(0, len(items), self.workers):
+            deadline = time.monotonic() + self.max_wait_seconds
+            while time.monotonic() < deadline and self.logins_busy():
+                await asyncio.sleep(self.idle_seconds)
+            window = items[start:start + self.workers]
+            results += await asyncio.gather(*(loop.run_in_executor(self.executor, func, item) for item in window))
+        return results
+
+hashing_pool = HashingPool(settings.HASH_WORKERS, settings.HASH_MAX_QUEUE)
+bulk_hashing_pool = BulkHashingPool(settings.BULK_HASH_WORKERS, hashing_pool, settings.BULK_YIELD_TO_LOGINS)
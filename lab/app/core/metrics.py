@@ -0,0 +1,145 @@
+import threading
+import time
+from bisect import bisect_left
+from app.core.config import settings
+
+METRICS_ENABLED = settings.METRICS_ENABLED
+
+LATENCY_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+SIZE_BUCKETS = tuple(64 << (2 * i) for i in range(11))  # 64 B .. 64 MB
+RATIO_BUCKETS = (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.25, 1.5, 2.0)
+
+class Histogram:
+    # Prometheus-style histogram keyed by a single label value; each series is
+    # per-bucket counts followed by the sum and the count
+    def __init__(self, name: str, help: str, label: str, buckets: tuple):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, label_value: str, value: float):
+        with self.lock:
+            series = self.series.get(label_value)
+            if series is None:
+                series = self.series[label_value] = [0] * (len(self.buckets) + 3)
+            series[bisect_left(self.buckets, value)] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def drain(self) -> dict:
+        with self.lock:
+            series, self.series = self.series, {}
+        return series
+
+    def merge(self, series: dict):
+        with self.lock:
+            for label_value, values in series.items():
+                mine = self.series.get(label_value)
+                if mine is None:
+                    self.series[label_value] = list(values)
+                else:
+                    for i, value in enumerate(values):
+                        mine[i] += value
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            series = {label_value: list(values) for label_value, values in self.series.items()}
+        for label_value, values in sorted(series.items()):
+            label = f'{self.label}="{label_value}"'
+            cumulative = 0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{label}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{label}}} {values[-1]}")
+        return lines
+
+stage_seconds = Histogram("codec_stage_seconds", "Time spent per codec stage", "stage", LATENCY_BUCKETS)
+stage_bytes_in = Histogram("codec_stage_bytes_in", "Input size per codec stage", "stage", SIZE_BUCKETS)
+stage_bytes_out = Histogram("codec_stage_bytes_out", "Output size per codec stage", "stage", SIZE_BUCKETS)
+stage_ratio = Histogram("codec_stage_compression_ratio", "Output/input size per codec stage", "stage", RATIO_BUCKETS)
+request_seconds = Histogram("http_request_seconds", "Request latency per route", "route", LATENCY_BUCKETS)
+HISTOGRAMS = (stage_seconds, stage_bytes_in, stage_bytes_out, stage_ratio, request_seconds)
+
+class Stage:
+    __slots__ = ("name", "start", "bytes_in", "bytes_out")
+
+    def __init__(self, name: str, bytes_in=None):
+        self.name = name
+        self.bytes_in = bytes_in
+        self.bytes_out = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        stage_seconds.observe(self.name, time.perf_counter() - self.start)
+        if self.bytes_in is not None:
+            stage_bytes_in.observe(self.name, self.bytes_in)
+        if self.bytes_out is not None:
+            stage_bytes_out.observe(self.name, self.bytes_out)
+            if self.bytes_in:
+                stage_ratio.observe(self.name, self.bytes_out / self.bytes_in)
+
+class NullStage:
+    # Shared do-nothing stage handed out while metrics are disabled
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+NULL_STAGE = NullStage()
+
+def stage(name: str, bytes_in=None):
+    if not METRICS_ENABLED:
+        return NULL_STAGE
+    return Stage(name, bytes_in)
+
+def collect(func, *args):
+    # Runs in a codec worker process and ships its samples back with the result;
+    # whatever was recorded before came in through fork and is already counted
+    for histogram in HISTOGRAMS:
+        histogram.drain()
+    result = func(*args)
+    return result, {histogram.name: histogram.drain() for histogram in HISTOGRAMS}
+
+def merge(samples: dict):
+    for histogram in HISTOGRAMS:
+        histogram.merge(samples.get(histogram.name, {}))
+
+def render() -> str:
+    lines = []
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.render())
+    return "\n".join(lines) + "\n"
+
+class MetricsMiddleware:
+    # Plain ASGI so the request path pays for one timer and nothing else;
+    # routes are labelled by endpoint name to keep the series count bounded
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            endpoint = scope.get("endpoint")
+            route = f"{scope['method']} {endpoint.__name__}" if endpoint else "unmatched"
+            request_seconds.observe(route, time.perf_counter() - start)
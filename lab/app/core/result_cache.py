@@ -0,0 +1,199 @@
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple
+from app.core.config import settings
+
+# Bump when the encoder output changes, so old disk entries and client ETags stop matching
+RESULT_FORMAT_VERSION = 2
+
+def result_key(*parts) -> str:
+    # Length-prefixed so ("ab", "c") and ("a", "bc") hash differently
+    digest = hashlib.sha256(b"v%d" % RESULT_FORMAT_VERSION)
+    for part in parts:
+        data = part if isinstance(part, bytes) else str(part).encode("utf-8", "surrogatepass")
+        digest.update(len(data).to_bytes(8, "big"))
+        digest.update(data)
+    return digest.hexdigest()
+
+def meta_header(meta: dict) -> bytes:
+    return json.dumps(meta).encode() + b"\n"
+
+def entry_size(raw: bytes, meta: dict) -> int:
+    # One size for the memory and disk tiers: the payload plus its disk header
+    return len(raw) + len(meta_header(meta))
+
+class ResultCache:
+    # Digest -> (payload, metadata); a byte-bounded LRU in memory with an
+    # optional directory shared by every worker process behind it
+    def __init__(self, max_bytes: int, max_item_bytes: int, directory: str = "", disk_max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self.max_item_bytes = max_item_bytes
+        self.directory = directory or None
+        self.disk_max_bytes = disk_max_bytes
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.disk_lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.not_modified = 0
+        self.disk_bytes = 0
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            self.disk_bytes = sum(size for _, size, _ in self.disk_files())
+
+    def get(self, digest: str) -> Optional[Tuple[bytes, dict]]:
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is not None:
+                self.entries.move_to_end(digest)
+                self.hits += 1
+                return entry[0], entry[1]
+        return None
+
+    def put(self, digest: str, raw: bytes, meta: dict, size: Optional[int] = None):
+        if size is None:
+            size = entry_size(raw, meta)
+        if size > self.max_item_bytes:
+            return
+        with self.lock:
+            old = self.entries.pop(digest, None)
+            if old is not None:
+                self.bytes -= old[2]
+            self.entries[digest] = (raw, meta, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, (_, _, evicted) = self.entries.popitem(last=False)
+                self.bytes -= evicted
+                self.evictions += 1
+
+    async def lookup(self, digest: str) -> Optional[Tuple[bytes, dict]]:
+        cached = self.get(digest)
+        if cached is None and self.directory:
+            cached = await asyncio.to_thread(self.read_disk, digest)
+            if cached is not None:
+                self.put(digest, *cached)
+        if cached is None:
+            with self.lock:
+                self.misses += 1
+        return cached
+
+    async def store(self, digest: str, raw: bytes, meta: dict):
+        size = entry_size(raw, meta)
+        self.put(digest, raw, meta, size)
+        if self.directory and size <= self.max_item_bytes:
+            await asyncio.to_thread(self.write_disk, digest, raw, meta)
+
+    def path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], digest)
+
+    def read_disk(self, digest: str) -> Optional[Tuple[bytes, dict]]:
+        path = self.path(digest)
+        try:
+            with open(path, "rb") as f:
+                header, raw = f.read().split(b"\n", 1)
+            meta = json.loads(header)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+        with self.lock:
+            self.disk_hits += 1
+        return raw, meta
+
+    def write_disk(self, digest: str, raw: bytes, meta: dict):
+        path = self.path(digest)
+        header = meta_header(meta)
+        # Write-then-rename so concurrent readers never see a partial entry
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        except OSError:
+            return
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                f.write(raw)
+            try:
+                replaced = os.stat(path).st_size
+            except FileNotFoundError:
+                replaced = 0
+            os.replace(tmp, path)
+        except OSError:
+            # The disk tier is best effort, a full or missing disk only costs hits
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            return
+        with self.disk_lock:
+            self.disk_bytes += len(header) + len(raw) - replaced
+            if self.disk_bytes > self.disk_max_bytes:
+                self.trim_disk()
+
+    def disk_files(self):
+        for root, _dirs, names in os.walk(self.directory):
+            for name in names:
+                if name.endswith(".tmp"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                yield path, stat.st_size, stat.st_mtime
+
+    def trim_disk(self):
+        # Oldest first by mtime (reads touch entries), down to 90% of the cap
+        files = sorted(self.disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        for path, size, _ in files:
+            if total <= self.disk_max_bytes * 0.9:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self.disk_bytes = total
+
+    def record_not_modified(self):
+        with self.lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self.entries),
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "max_item_bytes": self.max_item_bytes,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits + self.disk_hits) / total if total else 0.0,
+                "evictions": self.evictions,
+                "not_modified": self.not_modified,
+                "disk": {
+                    "directory": self.directory,
+                    "bytes": self.disk_bytes,
+                    "max_bytes": self.disk_max_bytes,
+                } if self.directory else None,
+            }
+
+result_cache = ResultCache(
+    settings.RESULT_CACHE_MAX_BYTES,
+    settings.RESULT_CACHE_MAX_ITEM_BYTES,
+    settings.RESULT_CACHE_DIR,
+    settings.RESULT_CACHE_DISK_MAX_BYTES
+)
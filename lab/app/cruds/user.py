@@ -1,3 +1,7 @@
+from typing import Dict, List, Optional, Set, Tuple
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
 from app.schemas.user import UserCreate
@@ -6,8 +10,9 @@ from app.core.security import get_password_hash
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, user: UserCreate):
-    hashed_password = get_password_hash(user.password)
+def create_user(db: Session, user: UserCreate, hashed_password: Optional[str] = None):
+    if hashed_password is None:
+        hashed_password = get_password_hash(user.password)
     db_user = User(email=user.email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
@@ -15,4 +20,57 @@ def create_user(db: Session, user: UserCreate):
     return db_user
 
 def get_user(db: Session, user_id: int):
-    return db.query(User).filter(User.id == user_id).first() 
\ No newline at end of file
+    return db.query(User).filter(User.id == user_id).first()
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def create_user_async(db: AsyncSession, user: UserCreate, hashed_password: str):
+    db_user = User(email=user.email, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def get_user_async(db: AsyncSession, user_id: int):
+    return await db.get(User, user_id)
+
+async def get_existing_emails_async(db: AsyncSession, emails: List[str], chunk_size: int = 500) -> Set[str]:
+    # Chunked to stay under SQLite's bound-parameter limit
+    existing = set()
+    for start in range(0, len(emails), chunk_size):
+        result = await db.execute(select(User.email).where(User.email.in_(emails[start:start + chunk_size])))
+        existing.update(result.scalars())
+    return existing
+
+async def create_users_bulk_async(db: AsyncSession, rows: List[Tuple[str, str]], batch_size: int) -> Dict[str, Optional[int]]:
+    # rows are (email, hashed_password); returns email -> new id, or None when
+    # the email was taken in the meantime
+    ids = {}
+    for start in range(0, len(rows), batch_size):
+        values = [
+            {"email": email, "hashed_password": hashed_password, "is_active": True}
+            for email, hashed_password in rows[start:start + batch_size]
+        ]
+        try:
+            # One multi-row INSERT and one commit per batch
+            result = await db.execute(
+                insert(User).returning(User.id, User.email, sort_by_parameter_order=True), values
+            )
+            batch_ids = {email: user_id for user_id, email in result}
+            await db.commit()
+            ids.update(batch_ids)
+        except IntegrityError:
+            # A concurrent sign-up took one of the emails: redo this batch row by row
+            await db.rollback()
+            for value in values:
+                try:
+                    result = await db.execute(insert(User).returning(User.id), value)
+                    user_id = result.scalar_one()
+                    await db.commit()
+                    ids[value["email"]] = user_id
+                except IntegrityError:
+                    await db.rollback()
+                    ids[value["email"]] = None
+    return ids
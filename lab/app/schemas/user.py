@@ -1,3 +1,4 @@
+from typing import Literal
 from pydantic import BaseModel, EmailStr
 
 class UserBase(BaseModel):
@@ -21,4 +22,18 @@ class TokenData(BaseModel):
     email: str | None = None
 
 class UserWithToken(User):
-    token: Token 
\ No newline at end of file
+    token: Token 
+
+class UserBulkCreate(BaseModel):
+    users: list[UserCreate]
+
+class UserBulkRow(BaseModel):
+    email: str
+    status: Literal["created", "duplicate"]
+    id: int | None = None
+    detail: str | None = None
+
+class UserBulkResult(BaseModel):
+    created: int
+    duplicates: int
+    results: list[UserBulkRow]
\ No newline at end of file
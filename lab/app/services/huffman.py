@@ -1,6 +1,10 @@
 import heapq
+import struct
 from collections import defaultdict
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+from app.core.metrics import stage
+
+DECODE_TABLE_BITS = 12
 
 class HuffmanNode:
     def __init__(self, char=None, freq=0, left=None, right=None):
@@ -35,17 +39,179 @@ def build_huffman_codes(node: HuffmanNode, code: str = "", codes: Dict[str, str]
         codes = {}
     
     if node.char is not None:
-        codes[node.char] = code
+        # A one-symbol text still needs one bit per character
+        codes[node.char] = code or "0"
     else:
         build_huffman_codes(node.left, code + "0", codes)
         build_huffman_codes(node.right, code + "1", codes)
     
     return codes
 
-def encode_text(text: str, codes: Dict[str, str]) -> str:
+def canonical_codes(lengths: Dict[str, int]) -> Dict[str, str]:
+    codes = {}
+    value = 0
+    prev_len = 0
+    # Codes are assigned in (length, symbol) order, so the lengths alone define them
+    for char, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        value <<= length - prev_len
+        codes[char] = format(value, f"0{length}b")
+        value += 1
+        prev_len = length
+    return codes
+
+def pack_code_lengths(codes: Dict[str, str]) -> bytes:
+    # Header: u32 symbol count, then UTF-8 symbol and u8 code length for each entry
+    header = bytearray(struct.pack(">I", len(codes)))
+    for char, code in codes.items():
+        header += char.encode("utf-8")
+        header.append(len(code))
+    return bytes(header)
+
+def unpack_code_lengths(data: bytes) -> Tuple[Dict[str, str], int]:
+    if len(data) < 4:
+        raise ValueError("Truncated Huffman header")
+    (count,) = struct.unpack_from(">I", data)
+    pos = 4
+    lengths = {}
+    for _ in range(count):
+        if pos >= len(data):
+            raise ValueError("Truncated Huffman header")
+        lead = data[pos]
+        size = 1 if lead < 0x80 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        char = bytes(data[pos:pos + size]).decode("utf-8")
+        pos += size
+        if pos >= len(data):
+            raise ValueError("Truncated Huffman header")
+        lengths[char] = data[pos]
+        pos += 1
+    return canonical_codes(lengths), pos
+
+def bits_to_bytes(bits: str) -> bytes:
+    return bytes(int(bits[i:i + 8], 2) for i in range(0, len(bits) - len(bits) % 8, 8))
+
+def read_header_bits(encoded_text: str) -> Tuple[Dict[str, str], str]:
+    # The header is at most 4 + 5 bytes per symbol, so only that prefix is converted
+    count = int(encoded_text[:32], 2) if len(encoded_text) >= 32 else 0
+    prefix = bits_to_bytes(encoded_text[:8 * (4 + 5 * count)])
+    codes, offset = unpack_code_lengths(prefix)
+    return codes, encoded_text[8 * offset:]
+
+PACK_CHUNK_CHARS = 1 << 16
+
+def pack_text(text: str, codes: Dict[str, str], out: bytearray) -> int:
+    # Appends the packed code bits to out and returns the padding; the '0'/'1'
+    # string only ever holds one chunk of text plus fewer than 8 carried bits
+    carry = ""
+    for start in range(0, len(text), PACK_CHUNK_CHARS):
+        bits = carry + "".join(map(codes.__getitem__, text[start:start + PACK_CHUNK_CHARS]))
+        whole = len(bits) - len(bits) % 8
+        if whole:
+            out += int(bits[:whole], 2).to_bytes(whole // 8, "big")
+        carry = bits[whole:]
+    padding = (8 - len(carry)) % 8
+    if carry:
+        out.append(int(carry + "0" * padding, 2))
+    return padding
+
+def encode_text(text: str, codes: Dict[str, str], packed: bool = False) -> Union[str, bytes]:
+    if packed:
+        out = bytearray()
+        pack_text(text, codes, out)
+        return out
     return "".join(codes[char] for char in text)
 
-def decode_text(encoded_text: str, codes: Dict[str, str]) -> str:
+# Same table layout and names as labb2/app/services/huffman.py, plus a root
+# width that shrinks for short payloads
+def _fill_table(entries: List[Tuple[int, int, str]], width: int) -> Tuple[int, list]:
+    # Entries are (value, length, char) with codes relative to this level
+    table = [None] * (1 << width)
+    longer = {}
+    for value, length, char in entries:
+        if length <= width:
+            shift = width - length
+            start = value << shift
+            slot = (char, length, char, length)
+            for i in range(start, start + (1 << shift)):
+                table[i] = slot
+        else:
+            rest = length - width
+            longer.setdefault(value >> rest, []).append((value & ((1 << rest) - 1), rest, char))
+    for prefix, sub in longer.items():
+        sub_width = min(max(length for _value, length, _char in sub), DECODE_TABLE_BITS)
+        table[prefix] = (_fill_table(sub, sub_width), 0, None, 0)
+    return width, table
+
+def _pack_table(width: int, table: list) -> list:
+    # Let each slot of the root table emit every symbol that fits in its bits
+    packed = [None] * len(table)
+    for i, slot in enumerate(table):
+        if slot is None or slot[1] == 0:
+            packed[i] = slot
+            continue
+        chars = [slot[0]]
+        used = slot[1]
+        while True:
+            rest = width - used
+            following = table[(i << used) & ((1 << width) - 1)] if rest else None
+            if following is None or following[1] == 0 or following[1] > rest:
+                break
+            chars.append(following[0])
+            used += following[1]
+        packed[i] = ("".join(chars), used, slot[0], slot[1])
+    return packed
+
+def build_decode_table(codes: Dict[str, str], width: int = DECODE_TABLE_BITS) -> Tuple[int, list]:
+    entries = [(int(code, 2), len(code), char) for char, code in codes.items()]
+    if not entries:
+        return 0, [None]
+    width, table = _fill_table(entries, width)
+    return width, _pack_table(width, table)
+
+def decode_packed(data: bytes, codes: Dict[str, str], padding: int = 0) -> str:
+    total = len(data) * 8 - padding
+    if total <= 0 or not codes:
+        return ""
+    # The root table has 1 << width slots to fill, so short payloads get a narrower one
+    root_width, root = build_decode_table(codes, max(1, min(DECODE_TABLE_BITS, total.bit_length() - 5)))
+    root_mask = (1 << root_width) - 1
+    width, mask, table = root_width, root_mask, root
+    decoded = []
+    acc = 0
+    nbits = 0
+    pos = 0
+    # Bits are pulled 64 at a time into acc; the low nbits of acc are unread
+    while total > 0:
+        if nbits < width:
+            acc = ((acc & ((1 << nbits) - 1)) << 64) | int.from_bytes(data[pos:pos + 8].ljust(8, b"\0"), "big")
+            pos += 8
+            nbits += 64
+        slot = table[(acc >> (nbits - width)) & mask]
+        if slot is None:
+            raise ValueError("Invalid Huffman code in data")
+        chars, length = slot[0], slot[1]
+        if length == 0:
+            if total < width:
+                break
+            nbits -= width
+            total -= width
+            width, table = chars
+            mask = (1 << width) - 1
+            continue
+        if length > total:
+            # Near the end only the first code of a merged slot may be real data
+            chars, length = slot[2], slot[3]
+            if length > total:
+                break
+        nbits -= length
+        total -= length
+        decoded.append(chars)
+        width, mask, table = root_width, root_mask, root
+    return "".join(decoded)
+
+def decode_text(encoded_text: Union[str, bytes], codes: Dict[str, str], padding: int = 0) -> str:
+    if isinstance(encoded_text, (bytes, bytearray)):
+        # Packed mode: padding is only known here, the text path strips it beforehand
+        return decode_packed(encoded_text, codes, padding)
     reverse_codes = {v: k for k, v in codes.items()}
     current_code = ""
     decoded_text = ""
@@ -58,13 +224,44 @@ def decode_text(encoded_text: str, codes: Dict[str, str]) -> str:
     
     return decoded_text
 
-def huffman_encode(text: str) -> Tuple[str, Dict[str, str], int]:
-    frequency = build_frequency_dict(text)
-    tree = build_huffman_tree(frequency)
-    codes = build_huffman_codes(tree)
-    encoded_text = encode_text(text, codes)
+def build_codes(frequency: Dict[str, int], canonical: bool = False) -> Dict[str, str]:
+    codes = build_huffman_codes(build_huffman_tree(frequency))
+    if canonical:
+        codes = canonical_codes({char: len(code) for char, code in codes.items()})
+    return codes
+
+def huffman_encode(
+    text: str,
+    canonical: bool = False,
+    packed: bool = False,
+    code_tables: Optional[dict] = None
+) -> Tuple[Union[str, bytes], Dict[str, str], int]:
+    with stage("huffman.frequency", len(text)):
+        frequency = build_frequency_dict(text)
+    with stage("huffman.tree"):
+        if code_tables is None:
+            codes = build_codes(frequency, canonical)
+        else:
+            # Callers encoding many texts share built tables between equal histograms
+            table_key = (canonical, frozenset(frequency.items()))
+            codes = code_tables.get(table_key)
+            if codes is None:
+                codes = code_tables[table_key] = build_codes(frequency, canonical)
+    with stage("huffman.pack", len(text)) as timer:
+        if packed:
+            # Packed mode: real bytes written after the header (if any), never a full bit string
+            out = bytearray(pack_code_lengths(codes) if canonical else b"")
+            padding = pack_text(text, codes, out)
+            timer.bytes_out = len(out)
+            return out, codes, padding
+        encoded_text = encode_text(text, codes)
+        if canonical:
+            # Header bits go first so the decoder can rebuild the codes without the dict
+            encoded_text = "".join(f"{byte:08b}" for byte in pack_code_lengths(codes)) + encoded_text
 
-    padding = (8 - len(encoded_text) % 8) % 8
-    encoded_text += "0" * padding
+        padding = (8 - len(encoded_text) % 8) % 8
+        encoded_text += "0" * padding
+        # One character per bit on this path
+        timer.bytes_out = len(encoded_text)
     
     return encoded_text, codes, padding 
\ No newline at end of file
@@ -1,16 +1,40 @@
-def xor_encrypt(text: str, key: str) -> bytes:
-    text_bytes = text.encode('utf-8')
-    key_bytes = key.encode('utf-8')
+from typing import Union
+from app.core.metrics import stage
 
-    repeated_key = (key_bytes * (len(text_bytes) // len(key_bytes) + 1))[:len(text_bytes)]
+XOR_BLOCK_SIZE = 1 << 16
 
-    encrypted_bytes = bytes(a ^ b for a, b in zip(text_bytes, repeated_key))
-    return encrypted_bytes
+def xor_into(buf, key_bytes: bytes, offset: int = 0) -> None:
+    # XOR a writable buffer in place, a whole block of the tiled key at a time
+    if not key_bytes:
+        raise ValueError("Key must not be empty")
+    view = memoryview(buf).cast('B')
+    size = len(view)
+    if not size:
+        return
+    key_len = len(key_bytes)
+    start = offset % key_len
+    rotated = key_bytes[start:] + key_bytes[:start]
 
-def xor_decrypt(encrypted_bytes: bytes, key: str) -> str:
-    key_bytes = key.encode('utf-8')
+    # Blocks are a multiple of the key length so the same tiled key fits every full block
+    block = min(size, key_len * max(1, XOR_BLOCK_SIZE // key_len))
+    tiled = (rotated * (block // key_len + 1))[:block]
+    key_int = int.from_bytes(tiled, 'big')
+
+    for pos in range(0, size, block):
+        chunk = view[pos:pos + block]
+        n = len(chunk)
+        k = key_int if n == block else int.from_bytes(tiled[:n], 'big')
+        chunk[:] = (int.from_bytes(chunk, 'big') ^ k).to_bytes(n, 'big')
 
-    repeated_key = (key_bytes * (len(encrypted_bytes) // len(key_bytes) + 1))[:len(encrypted_bytes)]
+def xor_bytes(data: Union[bytes, bytearray], key: str) -> bytearray:
+    # A bytearray from the caller is XORed in place and handed back, bytes are copied once
+    with stage("xor", len(data)):
+        buf = data if isinstance(data, bytearray) else bytearray(data)
+        xor_into(buf, key.encode('utf-8'))
+        return buf
 
-    decrypted_bytes = bytes(a ^ b for a, b in zip(encrypted_bytes, repeated_key))
-    return decrypted_bytes.decode('utf-8') 
\ No newline at end of file
+def xor_encrypt(text: Union[str, bytes, bytearray], key: str) -> bytearray:
+    return xor_bytes(bytearray(text, 'utf-8') if isinstance(text, str) else text, key)
+
+def xor_decrypt(encrypted_bytes: bytes, key: str) -> str:
+    return xor_bytes(encrypted_bytes, key).decode('utf-8')
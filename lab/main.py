@@ -1,25 +1,57 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.endpoints import auth, encode
+from fastapi.responses import JSONResponse, ORJSONResponse
+from app.api.endpoints import auth, encode, metrics
 from app.core.config import settings
+from app.core.hashing import HashingOverloaded
+from app.core.metrics import METRICS_ENABLED, MetricsMiddleware
+from app.services.codec_pool import codec_pool
 from app.db.base_class import Base
 from app.db.session import engine
 
-Base.metadata.create_all(bind=engine)
+def create_app() -> FastAPI:
+    # Building the app has no side effects, the schema is checked when it starts serving
+    app = FastAPI(
+        title=settings.PROJECT_NAME,
+        version=settings.VERSION,
+        openapi_url=f"{settings.API_V1_STR}/openapi.json",
+        default_response_class=ORJSONResponse
+    )
 
-app = FastAPI(
-    title=settings.PROJECT_NAME,
-    version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
-)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+        # Octet-stream /encode responses carry their metadata in these headers
+        expose_headers=["X-Key", "X-Huffman-Codes", "X-Padding", "X-Packed"],
+    )
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+    app.include_router(auth.router, prefix=settings.API_V1_STR, tags=["auth"])
+    app.include_router(encode.router, prefix=settings.API_V1_STR, tags=["encode"])
+    app.include_router(metrics.router, tags=["metrics"])
 
-app.include_router(auth.router, prefix=settings.API_V1_STR, tags=["auth"])
-app.include_router(encode.router, prefix=settings.API_V1_STR, tags=["encode"]) 
\ No newline at end of file
+    # Only installed when enabled, so disabled metrics cost nothing per request
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.on_event("startup")
+    def create_schema():
+        Base.metadata.create_all(bind=engine)
+
+    @app.on_event("shutdown")
+    def shutdown_codec_pool():
+        codec_pool.shutdown()
+
+    @app.exception_handler(HashingOverloaded)
+    async def hashing_overloaded_handler(request: Request, exc: HashingOverloaded):
+        return JSONResponse(
+            status_code=503,
+            content={"detail": str(exc)},
+            headers={"Retry-After": "1"},
+        )
+
+    return app
+
+app = create_app()
@@ -1,30 +1,36 @@
 from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.schemas.user import UserCreate, UserOut, UserMe
-from app.cruds.user import get_user_by_email, create_user, verify_password
+from app.cruds.user import get_user_by_email_async, create_user_async, hash_password_async, verify_password_async
 from app.core.security import create_access_token
-from app.db.session import get_db
+from app.db.session import get_async_db
 from app.core.deps import get_current_user
+from app.core.auth_cache import principal_cache
 
 router = APIRouter()
 
 @router.post("/sign-up/", response_model=UserOut)
-def sign_up(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, user.email)
+async def sign_up(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user_by_email_async(db, user.email)
     if db_user:
         raise HTTPException(status_code=400, detail="Email already registered")
-    new_user = create_user(db, user.email, user.password)
+    hashed_password = await hash_password_async(user.password)
+    new_user = await create_user_async(db, user.email, hashed_password)
     token = create_access_token({"sub": new_user.email})
     return UserOut(id=new_user.id, email=new_user.email, token=token)
 
 @router.post("/login/", response_model=UserOut)
-def login(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = get_user_by_email(db, user.email)
-    if not db_user or not verify_password(user.password, db_user.hashed_password):
+async def login(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    db_user = await get_user_by_email_async(db, user.email)
+    if not db_user or not await verify_password_async(user.password, db_user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     token = create_access_token({"sub": db_user.email})
     return UserOut(id=db_user.id, email=db_user.email, token=token)
 
 @router.get("/users/me/", response_model=UserMe)
 def get_me(current_user: UserMe = Depends(get_current_user)):
-    return current_user 
\ No newline at end of file
+    return current_user
+
+@router.get("/auth-cache/stats/")
+def get_auth_cache_stats(current_user: UserMe = Depends(get_current_user)):
+    return principal_cache.stats()
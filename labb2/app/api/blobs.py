@@ -0,0 +1,59 @@
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from typing import Optional, Tuple
+from app.core.blob_store import blob_store
+
+BLOB_READ_CHUNK = 256 * 1024
+
+router = APIRouter()
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    # a single "bytes=" range as (start, end inclusive); anything else is served whole
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, sep, last = header[6:].strip().partition("-")
+    if not sep:
+        return None
+    try:
+        if first:
+            start = int(first)
+            end = int(last) if last else size - 1
+        else:
+            start = max(0, size - int(last))
+            end = size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise HTTPException(status_code=416, detail="Requested range not satisfiable",
+                            headers={"Content-Range": f"bytes */{size}"})
+    return start, min(end, size - 1)
+
+def read_file(path: str, start: int, length: int):
+    with open(path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(BLOB_READ_CHUNK, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+@router.get("/blobs/{blob_id}")
+async def download_blob(blob_id: str, request: Request):
+    if blob_store.gc_due():
+        await run_in_threadpool(blob_store.gc)
+    found = blob_store.open(blob_id)
+    if found is None:
+        raise HTTPException(status_code=404, detail="Blob not found or expired")
+    path, size = found
+    headers = {"Accept-Ranges": "bytes", "ETag": f'"{blob_id}"'}
+    byte_range = parse_range(request.headers.get("range"), size)
+    if byte_range is None:
+        headers["Content-Length"] = str(size)
+        return StreamingResponse(read_file(path, 0, size), media_type="application/octet-stream", headers=headers)
+    start, end = byte_range
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    headers["Content-Length"] = str(end - start + 1)
+    return StreamingResponse(read_file(path, start, end - start + 1), status_code=206,
+                             media_type="application/octet-stream", headers=headers)
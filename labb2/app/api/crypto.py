@@ -1,12 +1,15 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from app.schemas.crypto import EncodeRequest, EncodeResponse, DecodeRequest, DecodeResponse
-from app.services.huffman import huffman_encode, huffman_decode
-from app.services.xor_cipher import xor_encrypt, xor_decrypt
-import base64
+from app.services.codec import encode_raw, decode_raw
+from app.services.stream import StreamEncoder, StreamDecoder, record, RECORD_DATA, RECORD_END, RECORD_ERROR
+from app.services.code_tables import code_table_stats
+from app.services.codec_pool import codec_pool
+from app.core.wire import read_request, binary_response, text_response, entity_tag, not_modified
+from app.core.result_cache import result_cache, result_key
+from app.core.deps import get_current_user
 import uuid
-from app.celery.tasks import encode_task
-from celery.result import AsyncResult
-from app.celery.config import celery_app
 import traceback
 import logging
 
@@ -14,43 +17,141 @@ logging.basicConfig(level=logging.INFO)
 
 router = APIRouter()
 
+async def run_codec(size: int, blocks: bool, func, *args, inline: bool = True):
+    # the block container fans its blocks out over the codec pool's processes from a thread
+    if blocks:
+        executor = codec_pool.get_executor() if codec_pool.workers > 0 else None
+        return await run_in_threadpool(func, *args, executor)
+    return await codec_pool.run(size, func, *args, inline=inline)
+
+# json (base64 payload), msgpack (raw bytes) or octet-stream (raw body,
+# other fields in X- headers), picked from Content-Type and Accept
 @router.post("/encode", response_model=EncodeResponse)
-def encode(data: EncodeRequest):
-    try:
-        encoded_bytes, codes, padding = huffman_encode(data.text)
-        encrypted_bytes = xor_encrypt(encoded_bytes, data.key)
-        encoded_data = base64.b64encode(encrypted_bytes).decode()
-        return EncodeResponse(
-            encoded_data=encoded_data,
-            key=data.key,
-            huffman_codes=codes,
-            padding=padding
-        )
-    except Exception as e:
-        tb = traceback.format_exc()
-        print("ERROR in encode:", tb)
-        raise HTTPException(status_code=500, detail=str(e))
+async def encode(request: Request):
+    data, _ = await read_request(request, EncodeRequest, "text")
+    # encoding is deterministic: repeats are served from result_cache, and
+    # clients that already hold the ETag get a 304
+    digest = result_key(data.text, data.key, data.canonical, data.alphabet, data.table_id, data.blocks)
+    etag = entity_tag(request, digest)
+    headers = {"ETag": etag, "Vary": "Accept"}
+    if not_modified(request, etag):
+        result_cache.record_not_modified()
+        return Response(status_code=304, headers=headers)
+    cached = await result_cache.lookup(digest)
+    if cached is not None:
+        encrypted_bytes, meta = cached
+    else:
+        try:
+            encrypted_bytes, meta = await run_codec(len(data.text), data.blocks, encode_raw, data)
+        except Exception as e:
+            tb = traceback.format_exc()
+            print("ERROR in encode:", tb)
+            raise HTTPException(status_code=500, detail=str(e))
+        await result_cache.store(digest, encrypted_bytes, meta)
+    return binary_response(request, "encoded_data", encrypted_bytes, {"key": data.key, **meta}, headers)
 
 @router.post("/decode", response_model=DecodeResponse)
-def decode(data: DecodeRequest):
+async def decode(request: Request):
+    data, encrypted_bytes = await read_request(request, DecodeRequest, "encoded_data", binary=True)
     try:
-        encrypted_bytes = base64.b64decode(data.encoded_data)
-        decoded_bytes = xor_decrypt(encrypted_bytes, data.key)
-        decoded_text = huffman_decode(decoded_bytes, data.huffman_codes, data.padding)
-        return DecodeResponse(decoded_text=decoded_text)
+        # never inline: building the decode table alone takes a few ms, whatever the payload size
+        decoded_text = await run_codec(len(encrypted_bytes), data.blocks, decode_raw, data, encrypted_bytes, inline=False)
+    except ValueError as e:
+        # malformed payloads (a truncated container, a code that is not in the table) are the client's
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         tb = traceback.format_exc()
         print("ERROR in decode:", tb)
         raise HTTPException(status_code=500, detail=str(e))
+    return text_response(request, "decoded_text", decoded_text)
+
+@router.get("/code-tables")
+def get_code_tables():
+    return code_table_stats()
+
+@router.get("/result-cache/stats/")
+def get_result_cache_stats(current_user = Depends(get_current_user)):
+    return result_cache.stats()
+
+async def stream_records(first: bytes, chunks, feed, finish, endpoint: str):
+    # once the 200 is out, a failure can only be reported in the body: output goes
+    # out as data records, and an error record or the end record closes it
+    if first:
+        yield record(RECORD_DATA, first)
+    try:
+        if chunks is not None:
+            async for chunk in chunks:
+                out = await run_in_threadpool(feed, chunk)
+                if out:
+                    yield record(RECORD_DATA, out)
+            out = await run_in_threadpool(finish)
+            if out:
+                yield record(RECORD_DATA, out)
+    except ValueError as e:
+        logging.warning("[API] %s failed mid-stream: %s", endpoint, e)
+        yield record(RECORD_ERROR, str(e).encode())
+        return
+    yield record(RECORD_END)
+
+async def read_first(chunks, feed, finish, done) -> tuple:
+    # feeds the body until done(output so far) holds, before any headers go out,
+    # so errors there still get a 400; returns the output and the rest of the
+    # body (None once it is used up)
+    out = []
+    try:
+        while not done(out):
+            try:
+                chunk = await chunks.__anext__()
+            except StopAsyncIteration:
+                out.append(await run_in_threadpool(finish))
+                return out, None
+            out.append(await run_in_threadpool(feed, chunk))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return out, chunks
+
+@router.post("/encode-stream")
+async def encode_stream(request: Request, key: str):
+    if not key:
+        raise HTTPException(status_code=400, detail="Key must not be empty")
+    encoder = StreamEncoder(key)
+    chunks = request.stream().__aiter__()
+    # the first chunk is taken up front, so invalid UTF-8 there is a plain 400
+    first, chunks = await read_first(chunks, encoder.feed, encoder.finish, lambda out: len(out) > 0)
+    return StreamingResponse(stream_records(b''.join(first), chunks, encoder.feed, encoder.finish, "/encode-stream"),
+                             media_type="application/octet-stream")
+
+@router.post("/decode-stream")
+async def decode_stream(request: Request, key: str):
+    if not key:
+        raise HTTPException(status_code=400, detail="Key must not be empty")
+    decoder = StreamDecoder(key)
+    chunks = request.stream().__aiter__()
+    # the first frame is decoded up front, so a wrong key or a body that is not
+    # a stream at all still gets a 400
+    first, chunks = await read_first(chunks, decoder.feed, decoder.finish, lambda out: decoder.frames > 0)
+
+    def feed(chunk: bytes) -> bytes:
+        return decoder.feed(chunk).encode()
+
+    def finish() -> bytes:
+        return decoder.finish().encode()
+
+    return StreamingResponse(stream_records(''.join(first).encode(), chunks, feed, finish, "/decode-stream"),
+                             media_type="application/octet-stream")
 
+# celery (and its redis client) is imported on first use of these endpoints,
+# not when the app module is loaded
 @router.post("/encode-async/")
 def encode_async(data: EncodeRequest):
+    from app.celery.tasks import encode_task
     logging.info("[API] /encode-async/ called with: %s", data)
     try:
         task_id = str(uuid.uuid4())
         encode_task.apply_async(
             args=("encode", data.text, data.key),
-            kwargs={"task_id": task_id},
+            kwargs={"task_id": task_id, "alphabet": data.alphabet, "table_id": data.table_id, "canonical": data.canonical,
+                    "blocks": data.blocks},
             task_id=task_id
         )
         return {"task_id": task_id, "operation": "encode"}
@@ -61,12 +162,13 @@ def encode_async(data: EncodeRequest):
 
 @router.post("/decode-async/")
 def decode_async(data: DecodeRequest):
+    from app.celery.tasks import encode_task
     logging.info("[API] /decode-async/ called with: %s", data)
     try:
         task_id = str(uuid.uuid4())
         encode_task.apply_async(
             args=("decode", None, data.key, data.encoded_data, data.huffman_codes, data.padding),
-            kwargs={"task_id": task_id},
+            kwargs={"task_id": task_id, "alphabet": data.alphabet, "table_id": data.table_id, "blocks": data.blocks},
             task_id=task_id
         )
         return {"task_id": task_id, "operation": "decode"}
@@ -77,6 +179,8 @@ def decode_async(data: DecodeRequest):
 
 @router.get("/task-status/{task_id}")
 def get_task_status(task_id: str):
+    from celery.result import AsyncResult
+    from app.celery.config import celery_app
     logging.info("[API] /task-status/ called with: %s", task_id)
     result = AsyncResult(task_id, app=celery_app)
     response = {
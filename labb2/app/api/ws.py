@@ -1,13 +1,22 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.websocket.manager import manager
+from app.websocket.bridge import task_events
 
 router = APIRouter()
 
 @router.websocket("/ws/{task_id}")
 async def websocket_endpoint(websocket: WebSocket, task_id: str):
-    await manager.connect(task_id, websocket)
+    connection = await manager.connect(task_id, websocket)
+    subscribed = False
     try:
+        # events for this task reach this process only while someone here is watching it
+        await task_events.subscribe(task_id)
+        subscribed = True
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(task_id) 
\ No newline at end of file
+        pass
+    finally:
+        manager.disconnect(task_id, connection)
+        if subscribed:
+            await task_events.unsubscribe(task_id)
\ No newline at end of file
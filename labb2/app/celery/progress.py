@@ -0,0 +1,60 @@
+import os
+import time
+
+PROGRESS_MIN_INTERVAL = float(os.getenv("PROGRESS_MIN_INTERVAL", "0.5"))
+PROGRESS_MIN_DELTA = int(os.getenv("PROGRESS_MIN_DELTA", "5"))
+
+class ProgressReporter:
+    # every report is a result-backend write plus a pub/sub message; progress is
+    # sent after moving min_delta percent, or after min_interval with any movement,
+    # so slow tasks still tick and fast ones write at most 100 / min_delta times,
+    # while the start and final states always go out
+    def __init__(self, update_state, publish, operation: str, task_id: str = None,
+                 min_interval: float = PROGRESS_MIN_INTERVAL, min_delta: int = PROGRESS_MIN_DELTA):
+        self.update_state = update_state
+        self.publish = publish
+        self.operation = operation
+        self.task_id = task_id
+        self.min_interval = min_interval
+        self.min_delta = min_delta
+        self.last_time = None
+        self.last_percent = 0
+        self.reported = 0
+        self.writes = 0
+
+    def send(self, status: str, **fields) -> dict:
+        message = {"status": status, "task_id": self.task_id, "operation": self.operation, **fields}
+        if self.task_id:
+            self.publish(message)
+        return message
+
+    def start(self):
+        self.update_state(state='STARTED', meta=self.send("STARTED"))
+        self.writes += 1
+        self.last_time = time.monotonic()
+
+    def progress(self, done: int, total: int):
+        # proportional to input bytes consumed, not to the number of chunks
+        self.reported += 1
+        percent = 100 * done // total if total else 100
+        if percent >= 100:
+            # the final state follows right away and says the same
+            return
+        now = time.monotonic()
+        moved = percent - self.last_percent
+        if moved <= 0 or (moved < self.min_delta and now - self.last_time < self.min_interval):
+            return
+        self.last_percent = percent
+        self.last_time = now
+        self.update_state(state='PROGRESS', meta=self.send("PROGRESS", progress=percent, processed_bytes=done, total_bytes=total))
+        self.writes += 1
+
+    def finish(self, result: dict):
+        # the task's return value is the backend write for this one
+        self.send("COMPLETED", result=result)
+
+    def fail(self, error: Exception):
+        self.send("FAILED", error=str(error))
+
+    def stats(self) -> dict:
+        return {"reported": self.reported, "writes": self.writes, "saved": max(0, self.reported + 1 - self.writes)}
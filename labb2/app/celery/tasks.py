@@ -1,43 +1,57 @@
 from .config import celery_app
-import time
-import asyncio
-from app.websocket.manager import manager
+import os
+import base64
+import logging
+from app.websocket.bridge import task_events
+from .progress import ProgressReporter
+from app.core.blob_store import blob_store, RESULT_SPILL_BYTES
+from app.services.blocks import encode_blocks_progress, decode_blocks_progress
+from app.services.codec import encode_raw, decode_raw
+from app.schemas.crypto import EncodeRequest, DecodeRequest
+
+TASK_CHUNK_CHARS = int(os.getenv("TASK_CHUNK_CHARS", str(1 << 18)))
+
+def spill(field: str, data: bytes, inline) -> dict:
+    # big payloads stay out of the JSON result backend: the result keeps a
+    # reference and the bytes are fetched from /blobs/{id}
+    if len(data) > RESULT_SPILL_BYTES:
+        try:
+            blob_id = blob_store.put(data)
+        except OSError:
+            logging.warning("[TASK] could not spill %d bytes, returning them inline", len(data), exc_info=True)
+        else:
+            return {field: None, "blob": blob_store.reference(blob_id, len(data), field)}
+    return {field: inline(data)}
 
 @celery_app.task(bind=True)
-def encode_task(self, operation: str, text: str = None, key: str = None, encoded_data: str = None, huffman_codes: dict = None, padding: int = None, task_id: str = None):
-    loop = asyncio.get_event_loop()
-    if task_id:
-        loop.run_until_complete(manager.send_json(task_id, {
-            "status": "STARTED",
-            "task_id": task_id,
-            "operation": operation
-        }))
-    self.update_state(state='STARTED', meta={"status": "STARTED", "operation": operation})
-    for i in range(5):
-        if task_id:
-            loop.run_until_complete(manager.send_json(task_id, {
-                "status": "PROGRESS",
-                "task_id": task_id,
-                "operation": operation,
-                "progress": (i+1)*20
-            }))
-        self.update_state(state='PROGRESS', meta={"status": "PROGRESS", "operation": operation, "progress": (i+1)*20})
-        time.sleep(1)
-    if operation == "encode":
-        result = {
-            "encoded_data": "base64_encoded_string",
-            "huffman_codes": {"A": "0"},
-            "padding": 4
-        }
-    else:
-        result = {
-            "decoded_text": "Hello, World!"
-        }
-    if task_id:
-        loop.run_until_complete(manager.send_json(task_id, {
-            "status": "COMPLETED",
-            "task_id": task_id,
-            "operation": operation,
-            "result": result
-        }))
+def encode_task(self, operation: str, text: str = None, key: str = None, encoded_data: str = None, huffman_codes: dict = None, padding: int = None, task_id: str = None, alphabet: str = "char", table_id: str = None, blocks: bool = False, canonical: bool = False):
+    # the worker has no sockets of its own, the API processes relay these
+    reporter = ProgressReporter(self.update_state, lambda message: task_events.publish(task_id, message), operation, task_id)
+    reporter.start()
+    # progress goes out per block, so only the block container (blocks=true)
+    # reports it; a single Huffman stream, like /encode and /decode without
+    # blocks, has no boundaries to report between and sends STARTED and COMPLETED only
+    try:
+        if operation == "encode":
+            request = EncodeRequest(text=text, key=key, alphabet=alphabet, table_id=table_id, blocks=blocks, canonical=canonical)
+            if request.blocks:
+                # smaller blocks than /encode for finer progress, still a valid /decode body with blocks=true
+                data = encode_blocks_progress(text, key, reporter.progress, TASK_CHUNK_CHARS)
+                meta = {"huffman_codes": None, "padding": 0, "alphabet": "char", "table_id": None, "blocks": True}
+            else:
+                data, meta = encode_raw(request)
+            result = {**spill("encoded_data", data, lambda raw: base64.b64encode(raw).decode()), "key": key, **meta}
+        else:
+            if blocks:
+                decoded = decode_blocks_progress(base64.b64decode(encoded_data), key, reporter.progress)
+            else:
+                request = DecodeRequest(encoded_data=encoded_data, key=key, huffman_codes=huffman_codes, padding=padding,
+                                        alphabet=alphabet, table_id=table_id)
+                decoded = decode_raw(request, base64.b64decode(encoded_data))
+            result = spill("decoded_text", decoded.encode('utf-8', 'surrogatepass'), lambda raw: decoded)
+    except Exception as e:
+        reporter.fail(e)
+        raise
+    reporter.finish(result)
+    logging.info("[TASK] %s %s progress: %s", operation, task_id, reporter.stats())
     return {"status": "COMPLETED", "operation": operation, "result": result}
@@ -0,0 +1,92 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+from sqlalchemy import event, inspect
+from app.models.user import User
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+
+class PrincipalCache:
+    # verified bearer token -> user snapshot, bounded and evicted by TTL and token exp
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.hit_seconds = 0.0
+        self.miss_seconds = 0.0
+
+    def get(self, token: str) -> Optional[Any]:
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(token)
+            if entry is None:
+                return None
+            expires_at, principal = entry
+            if expires_at <= now:
+                del self.entries[token]
+                return None
+            self.entries.move_to_end(token)
+            return principal
+
+    def put(self, token: str, principal: Any, exp: Optional[float] = None):
+        expires_at = time.time() + self.ttl
+        if exp is not None:
+            # never outlive the token itself
+            expires_at = min(expires_at, float(exp))
+        with self.lock:
+            self.entries[token] = (expires_at, principal)
+            self.entries.move_to_end(token)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def invalidate_user(self, email: str):
+        with self.lock:
+            stale = [token for token, (_, principal) in self.entries.items() if principal.email == email]
+            for token in stale:
+                del self.entries[token]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def record_lookup(self, hit: bool, seconds: float):
+        with self.lock:
+            if hit:
+                self.hits += 1
+                self.hit_seconds += seconds
+            else:
+                self.misses += 1
+                self.miss_seconds += seconds
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "avg_hit_ms": 1000 * self.hit_seconds / self.hits if self.hits else 0.0,
+                "avg_miss_ms": 1000 * self.miss_seconds / self.misses if self.misses else 0.0,
+            }
+
+principal_cache = PrincipalCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_SECONDS)
+
+# every ORM update or delete of a user drops the principals cached for it,
+# under the old and the new email; inserts (sign-up) cannot be cached yet
+def invalidate_written_user(mapper, connection, target):
+    emails = {target.email, *inspect(target).attrs.email.history.deleted}
+    for email in emails:
+        principal_cache.invalidate_user(email)
+
+event.listen(User, "after_update", invalidate_written_user)
+event.listen(User, "after_delete", invalidate_written_user)
@@ -0,0 +1,93 @@
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import Optional, Tuple
+
+BLOB_DIR = os.getenv("BLOB_DIR", os.path.join(tempfile.gettempdir(), "labb2-blobs"))
+# task results bigger than this go to the blob store instead of the result backend
+RESULT_SPILL_BYTES = int(os.getenv("RESULT_SPILL_BYTES", str(1024 * 1024)))
+# matches Celery's default result_expires, so a reference never outlives its task
+BLOB_TTL_SECONDS = int(os.getenv("BLOB_TTL_SECONDS", str(24 * 3600)))
+BLOB_GC_INTERVAL = int(os.getenv("BLOB_GC_INTERVAL", "300"))
+
+BLOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+class BlobStore:
+    # large task results as plain files, written by workers and streamed by the
+    # API; both sides need the same directory (one host, or a shared volume)
+    def __init__(self, directory: str, ttl: int, gc_interval: int):
+        self.directory = directory
+        self.ttl = ttl
+        self.gc_interval = gc_interval
+        self.last_gc = None
+        self.lock = threading.Lock()
+
+    def path(self, blob_id: str) -> Optional[str]:
+        # ids come from URLs, anything but our own hex names is rejected
+        if not BLOB_ID.match(blob_id):
+            return None
+        return os.path.join(self.directory, blob_id)
+
+    def put(self, data: bytes) -> str:
+        if self.gc_due():
+            self.gc()
+        blob_id = uuid.uuid4().hex
+        os.makedirs(self.directory, exist_ok=True)
+        # write-then-rename so a download never sees a partial blob
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, self.path(blob_id))
+        except OSError:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        return blob_id
+
+    def open(self, blob_id: str) -> Optional[Tuple[str, int]]:
+        path = self.path(blob_id)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if time.time() - stat.st_mtime > self.ttl:
+            return None
+        return path, stat.st_size
+
+    def gc_due(self) -> bool:
+        # at most one sweep per gc_interval in each process that writes or serves blobs
+        now = time.monotonic()
+        with self.lock:
+            if self.last_gc is not None and now - self.last_gc < self.gc_interval:
+                return False
+            self.last_gc = now
+            return True
+
+    def gc(self) -> int:
+        # expired blobs and temp files left behind by crashed writers
+        removed = 0
+        cutoff = time.time() - self.ttl
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return 0
+        for name in names:
+            path = os.path.join(self.directory, name)
+            try:
+                if os.stat(path).st_mtime < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                continue
+        return removed
+
+    def reference(self, blob_id: str, size: int, field: str) -> dict:
+        return {"id": blob_id, "size": size, "field": field, "url": f"/blobs/{blob_id}"}
+
+blob_store = BlobStore(BLOB_DIR, BLOB_TTL_SECONDS, BLOB_GC_INTERVAL)
@@ -1,29 +1,41 @@
+import time
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from jose import jwt, JWTError
-from sqlalchemy.orm import Session
-from app.db.session import get_db
-from app.models.user import User
-from app.cruds.user import get_user_by_email
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db.session import get_async_db
+from app.schemas.user import UserMe
+from app.cruds.user import get_user_by_email_async
 from app.core.security import SECRET_KEY, ALGORITHM
+from app.core.auth_cache import principal_cache
+from app.core.metrics import stage
 
 bearer_scheme = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: Session = Depends(get_db)):
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme), db: AsyncSession = Depends(get_async_db)):
     token = credentials.credentials
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        email: str = payload.get("sub")
-        if email is None:
+    with stage("auth"):
+        start = time.perf_counter()
+        user = principal_cache.get(token)
+        if user is not None:
+            principal_cache.record_lookup(True, time.perf_counter() - start)
+            return user
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+            email: str = payload.get("sub")
+            if email is None:
+                raise credentials_exception
+        except JWTError:
             raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-    user = get_user_by_email(db, email=email)
-    if user is None:
-        raise credentials_exception
-    return user 
\ No newline at end of file
+        db_user = await get_user_by_email_async(db, email=email)
+        if db_user is None:
+            raise credentials_exception
+        user = UserMe.from_orm(db_user)
+        principal_cache.put(token, user, payload.get("exp"))
+        principal_cache.record_lookup(False, time.perf_counter() - start)
+        return user
@@ -0,0 +1,30 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+HASH_MAX_QUEUE = int(os.getenv("HASH_MAX_QUEUE", "32"))
+
+class HashingOverloaded(Exception):
+    pass
+
+class HashingPool:
+    # dedicated threads for password hashing, with a cap on running + queued jobs
+    def __init__(self, workers: int, max_queue: int):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pwhash")
+        self.slots = threading.BoundedSemaphore(workers + max_queue)
+        self.rejected = 0
+
+    async def run(self, func, *args):
+        if not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            raise HashingOverloaded("Password hashing queue is full")
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+        finally:
+            self.slots.release()
+
+hashing_pool = HashingPool(HASH_WORKERS, HASH_MAX_QUEUE)
@@ -0,0 +1,144 @@
+from fastapi import HTTPException, Request
+from fastapi.responses import ORJSONResponse, Response
+from pydantic import ValidationError
+from typing import Optional, Union, get_args, get_origin
+from urllib.parse import quote, unquote
+import base64
+import binascii
+import json
+import msgpack
+import orjson
+from app.core.metrics import stage
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+OCTET_STREAM = "application/octet-stream"
+
+MEDIA_TYPES = {
+    JSON: JSON,
+    MSGPACK: MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    OCTET_STREAM: OCTET_STREAM,
+}
+# visible ASCII stays readable, spaces (stripped by proxies) and "%" are escaped
+HEADER_SAFE = "".join(chr(c) for c in range(0x21, 0x7f) if chr(c) != "%")
+
+# Octet-stream bodies carry only the payload, the other fields travel as
+# X-<Field-Name> headers (huffman_codes -> X-Huffman-Codes, JSON-encoded);
+# header values are percent-encoded UTF-8, since headers themselves are latin-1
+def header_name(field: str) -> str:
+    return "X-" + "-".join(part.capitalize() for part in field.split("_"))
+
+def media_type(value: Optional[str]) -> Optional[str]:
+    if not value:
+        return None
+    return MEDIA_TYPES.get(value.split(";", 1)[0].strip().lower())
+
+def request_format(request: Request) -> str:
+    content_type = request.headers.get("content-type")
+    fmt = media_type(content_type)
+    if fmt is None and content_type:
+        raise HTTPException(status_code=415, detail=f"Unsupported content type: {content_type}")
+    return fmt or JSON
+
+def response_format(request: Request) -> str:
+    for value in request.headers.get("accept", "").split(","):
+        fmt = media_type(value)
+        if fmt is not None:
+            return fmt
+    return JSON
+
+def entity_tag(request: Request, digest: str) -> str:
+    # one tag per representation, the JSON and msgpack bodies of a result differ
+    return f'"{digest}.{response_format(request).split("/")[1]}"'
+
+def not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return etag in tags or "W/" + etag in tags
+
+def is_dict_field(annotation) -> bool:
+    if get_origin(annotation) is Union:
+        return any(is_dict_field(arg) for arg in get_args(annotation))
+    return annotation is dict or get_origin(annotation) is dict
+
+def header_value(value) -> str:
+    if isinstance(value, dict):
+        value = json.dumps(value, separators=(",", ":"))
+    elif isinstance(value, bool):
+        value = "true" if value else "false"
+    return quote(str(value), safe=HEADER_SAFE)
+
+def header_fields(request: Request, model) -> dict:
+    fields = {}
+    for field, info in model.__fields__.items():
+        name = header_name(field)
+        value = request.headers.get(name)
+        if value is None:
+            continue
+        if not value.isascii():
+            raise HTTPException(status_code=400, detail=f"{name} must be ASCII, percent-encode UTF-8 values")
+        try:
+            value = unquote(value, errors="strict")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail=f"{name} is not percent-encoded UTF-8")
+        fields[field] = json.loads(value) if is_dict_field(info.annotation) else value
+    return fields
+
+async def read_request(request: Request, model, data_field: str, binary: bool = False):
+    # Returns (model, raw); for binary payloads the data field is blanked in
+    # the model and its decoded bytes are returned as raw
+    fmt = request_format(request)
+    body = await request.body()
+    raw = None
+    try:
+        if fmt == OCTET_STREAM:
+            fields = header_fields(request, model)
+            if binary:
+                raw = body
+                fields[data_field] = ""
+            else:
+                fields[data_field] = body.decode("utf-8")
+        else:
+            fields = msgpack.unpackb(body, raw=False) if fmt == MSGPACK else orjson.loads(body)
+            if not isinstance(fields, dict):
+                raise ValueError("Request body must be an object")
+            if binary:
+                value = fields.get(data_field, "")
+                if isinstance(value, bytes):
+                    raw = value
+                else:
+                    with stage("base64", len(value)) as timer:
+                        raw = base64.b64decode(value, validate=True)
+                        timer.bytes_out = len(raw)
+                fields[data_field] = ""
+        return model(**fields), raw
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors())
+    except (ValueError, TypeError, binascii.Error, msgpack.UnpackException) as e:
+        raise HTTPException(status_code=400, detail=f"Malformed {fmt} body: {e}")
+
+def binary_response(request: Request, data_field: str, raw: bytes, meta: dict, headers: Optional[dict] = None) -> Response:
+    fmt = response_format(request)
+    headers = dict(headers or {})
+    if fmt == OCTET_STREAM:
+        for name, value in meta.items():
+            if value is not None:
+                headers[header_name(name)] = header_value(value)
+        return Response(content=raw, media_type=OCTET_STREAM, headers=headers)
+    if fmt == MSGPACK:
+        return Response(content=msgpack.packb({data_field: raw, **meta}), media_type=MSGPACK, headers=headers)
+    with stage("base64", len(raw)) as timer:
+        encoded = base64.b64encode(raw).decode()
+        timer.bytes_out = len(encoded)
+    return ORJSONResponse({data_field: encoded, **meta}, headers=headers)
+
+def text_response(request: Request, data_field: str, text: str) -> Response:
+    fmt = response_format(request)
+    if fmt == OCTET_STREAM:
+        return Response(content=text.encode(), media_type=OCTET_STREAM)
+    if fmt == MSGPACK:
+        return Response(content=msgpack.packb({data_field: text}), media_type=MSGPACK)
+    return ORJSONResponse({data_field: text})
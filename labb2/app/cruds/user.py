@@ -1,14 +1,18 @@
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from app.models.user import User
 from passlib.context import CryptContext
+from app.core.hashing import hashing_pool
 
 pwd_context = CryptContext(schemes=["pbkdf2_sha256"], deprecated="auto")
 
 def get_user_by_email(db: Session, email: str):
     return db.query(User).filter(User.email == email).first()
 
-def create_user(db: Session, email: str, password: str):
-    hashed_password = pwd_context.hash(password)
+def create_user(db: Session, email: str, password: str, hashed_password: str = None):
+    if hashed_password is None:
+        hashed_password = pwd_context.hash(password)
     db_user = User(email=email, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
@@ -16,4 +20,21 @@ def create_user(db: Session, email: str, password: str):
     return db_user
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password) 
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+async def get_user_by_email_async(db: AsyncSession, email: str):
+    result = await db.execute(select(User).where(User.email == email))
+    return result.scalars().first()
+
+async def create_user_async(db: AsyncSession, email: str, hashed_password: str):
+    db_user = User(email=email, hashed_password=hashed_password)
+    db.add(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    return db_user
+
+async def hash_password_async(password: str) -> str:
+    return await hashing_pool.run(pwd_context.hash, password)
+
+async def verify_password_async(plain_password, hashed_password) -> bool:
+    return await hashing_pool.run(verify_password, plain_password, hashed_password)
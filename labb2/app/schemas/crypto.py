@@ -1,21 +1,34 @@
 from pydantic import BaseModel
-from typing import Dict
+from typing import Dict, Literal, Optional
+
+# ids of the pre-trained tables in app/services/code_tables.py
+TableId = Literal["en", "ru", "json"]
 
 class EncodeRequest(BaseModel):
     text: str
     key: str
+    canonical: bool = False
+    alphabet: Literal["char", "byte"] = "char"
+    table_id: Optional[TableId] = None
+    blocks: bool = False
 
 class EncodeResponse(BaseModel):
     encoded_data: str
     key: str
-    huffman_codes: Dict[str, str]
+    huffman_codes: Optional[Dict[str, str]] = None
     padding: int
+    alphabet: Literal["char", "byte"] = "char"
+    table_id: Optional[TableId] = None
+    blocks: bool = False
 
 class DecodeRequest(BaseModel):
     encoded_data: str
     key: str
-    huffman_codes: Dict[str, str]
+    huffman_codes: Optional[Dict[str, str]] = None
     padding: int
+    alphabet: Literal["char", "byte"] = "char"
+    table_id: Optional[TableId] = None
+    blocks: bool = False
 
 class DecodeResponse(BaseModel):
     decoded_text: str 
\ No newline at end of file
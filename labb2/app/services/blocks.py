@@ -0,0 +1,113 @@
+import struct
+from concurrent.futures import Executor
+from typing import Callable, List, Optional
+
+from app.services.huffman import huffman_encode, huffman_decode
+from app.services.xor_cipher import xor_into
+
+BLOCK_CHARS = 1 << 20
+BLOCK_MAGIC = b'HBF2'
+COUNT = struct.Struct('>I')
+
+# container: magic, u32 block count, u32 size of every block, then the blocks;
+# a block is u8 padding + canonical Huffman data, and the blocks are XORed as
+# one keystream, each from the offset where it starts after the index.
+# Huffman work fans out over the executor the caller passes (the codec pool in
+# the API); without one the blocks run one after another.
+
+def encode_block(text: str) -> bytes:
+    data, _codes, padding = huffman_encode(text, canonical=True)
+    block = bytearray([padding])
+    block += data
+    return block
+
+def decode_block(block: bytes, key: str, offset: int) -> str:
+    data = bytearray(block)
+    xor_into(data, key.encode(), offset)
+    return huffman_decode(data[1:], None, data[0])
+
+def block_offsets(blocks: List[bytes]) -> List[int]:
+    offsets = []
+    pos = 0
+    for block in blocks:
+        offsets.append(pos)
+        pos += len(block)
+    return offsets
+
+def _run(func, executor: Optional[Executor], *columns):
+    if executor is None or len(columns[0]) <= 1:
+        return list(map(func, *columns))
+    return list(executor.map(func, *columns))
+
+def encode_blocks(text: str, key: str, executor: Optional[Executor] = None, block_chars: int = BLOCK_CHARS) -> bytes:
+    if not key:
+        raise ValueError("Key must not be empty")
+    chunks = [text[i:i + block_chars] for i in range(0, len(text), block_chars)]
+    blocks = _run(encode_block, executor, chunks)
+    # sizes are only known once every block is encoded, so the XOR runs here
+    for block, offset in zip(blocks, block_offsets(blocks)):
+        xor_into(block, key.encode(), offset)
+    return pack_blocks(blocks)
+
+def decode_blocks(data: bytes, key: str, executor: Optional[Executor] = None) -> str:
+    if not key:
+        raise ValueError("Key must not be empty")
+    blocks = split_blocks(data)
+    return ''.join(_run(decode_block, executor, blocks, [key] * len(blocks), block_offsets(blocks)))
+
+def pack_blocks(blocks: List[bytes]) -> bytes:
+    out = bytearray(BLOCK_MAGIC)
+    out += COUNT.pack(len(blocks))
+    out += struct.pack(f'>{len(blocks)}I', *map(len, blocks))
+    for block in blocks:
+        out += block
+    return bytes(out)
+
+def split_blocks(data: bytes) -> List[bytes]:
+    if data[:4] != BLOCK_MAGIC:
+        raise ValueError("Not a block-framed container")
+    if len(data) < 8:
+        raise ValueError("Truncated block header")
+    (count,) = COUNT.unpack_from(data, 4)
+    pos = 8 + 4 * count
+    if len(data) < pos:
+        raise ValueError("Truncated block index")
+    sizes = struct.unpack_from(f'>{count}I', data, 8)
+    if pos + sum(sizes) != len(data):
+        raise ValueError("Block sizes do not match the container")
+    blocks = []
+    for size in sizes:
+        blocks.append(data[pos:pos + size])
+        pos += size
+    return blocks
+
+# serial versions for background jobs: same container, one block at a time, with
+# progress(done, total) after each block, in bytes of input consumed
+def encode_blocks_progress(text: str, key: str, progress: Callable[[int, int], None], block_chars: int = BLOCK_CHARS) -> bytes:
+    if not key:
+        raise ValueError("Key must not be empty")
+    total = len(text.encode('utf-8', 'surrogatepass'))
+    done = 0
+    offset = 0
+    blocks = []
+    for i in range(0, len(text), block_chars):
+        chunk = text[i:i + block_chars]
+        block = encode_block(chunk)
+        xor_into(block, key.encode(), offset)
+        offset += len(block)
+        blocks.append(block)
+        done += len(chunk.encode('utf-8', 'surrogatepass'))
+        progress(done, total)
+    return pack_blocks(blocks)
+
+def decode_blocks_progress(data: bytes, key: str, progress: Callable[[int, int], None]) -> str:
+    if not key:
+        raise ValueError("Key must not be empty")
+    blocks = split_blocks(data)
+    done = len(data) - sum(map(len, blocks))
+    parts = []
+    for block, offset in zip(blocks, block_offsets(blocks)):
+        parts.append(decode_block(block, key, offset))
+        done += len(block)
+        progress(done, len(data))
+    return ''.join(parts)
@@ -0,0 +1,86 @@
+import threading
+from typing import Dict, Tuple
+
+from app.core.metrics import register_counter
+from app.services.huffman import build_decode_table, byte_counts, build_codes
+
+# sample corpora the static byte-alphabet tables are trained on
+CORPORA = {
+    "en": (
+        "The quick brown fox jumps over the lazy dog. It is a truth universally acknowledged, "
+        "that a single man in possession of a good fortune, must be in want of a wife. "
+        "Call me Ishmael. Some years ago, never mind how long precisely, having little or no money "
+        "in my purse, and nothing particular to interest me on shore, I thought I would sail about "
+        "a little and see the watery part of the world. All happy families are alike; each unhappy "
+        "family is unhappy in its own way. It was the best of times, it was the worst of times."
+    ),
+    "ru": (
+        "Все счастливые семьи похожи друг на друга, каждая несчастливая семья несчастлива по-своему. "
+        "Мой дядя самых честных правил, когда не в шутку занемог, он уважать себя заставил и лучше "
+        "выдумать не мог. В начале июля, в чрезвычайно жаркое время, под вечер один молодой человек "
+        "вышел из своей каморки, которую нанимал от жильцов в С-м переулке, на улицу и медленно, "
+        "как бы в нерешимости, отправился к К-ну мосту. Широкая электрификация южных губерний даст "
+        "мощный толчок подъёму сельского хозяйства."
+    ),
+    "json": (
+        '{"id": 1, "email": "user@example.com", "is_active": true, "items": [{"name": "alpha", '
+        '"value": 0.5}, {"name": "beta", "value": 12}], "created_at": "2024-01-01T00:00:00Z", '
+        '"tags": ["a", "b", "c"], "meta": {"count": 3, "next": null}}'
+    ),
+}
+
+class StaticTables:
+    # canonical byte-alphabet tables, every byte gets a count so any input can be encoded;
+    # each is built on first use in every process, a hit is a request served by an
+    # already built table and a miss is a build
+    def __init__(self, corpora: Dict[str, str]):
+        self.corpora = dict(corpora)
+        self.tables = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, table_id: str) -> Tuple[Dict[str, str], Tuple[int, list]]:
+        with self.lock:
+            entry = self.tables.get(table_id)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            if table_id not in self.corpora:
+                raise ValueError(f"Unknown code table: {table_id}")
+            self.misses += 1
+            counts = byte_counts(self.corpora[table_id].encode())
+            code = build_codes(((chr(b), n + 1) for b, n in enumerate(counts)), canonical=True)
+            entry = (code, build_decode_table(code))
+            self.tables[table_id] = entry
+            return entry
+
+    def ids(self):
+        return sorted(self.corpora)
+
+    def drain(self) -> dict:
+        # tables are built per process, codec workers send their counts back to the app
+        with self.lock:
+            counts = {"hits": self.hits, "misses": self.misses}
+            self.hits = self.misses = 0
+        return counts
+
+    def merge(self, counts: dict):
+        with self.lock:
+            self.hits += counts["hits"]
+            self.misses += counts["misses"]
+
+    def stats(self) -> dict:
+        with self.lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
+
+static_tables = StaticTables(CORPORA)
+register_counter("code_tables", static_tables)
+
+def code_table_stats() -> dict:
+    return {"tables": static_tables.ids(), "cache": static_tables.stats()}
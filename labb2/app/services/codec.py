@@ -0,0 +1,45 @@
+from concurrent.futures import Executor
+from typing import Optional, Tuple
+
+from app.schemas.crypto import EncodeRequest, DecodeRequest
+from app.services.huffman import huffman_encode, huffman_decode, huffman_encode_bytes, huffman_decode_bytes
+from app.services.xor_cipher import xor_encrypt, xor_decrypt
+from app.services.code_tables import static_tables
+from app.services.blocks import encode_blocks, decode_blocks
+
+# shared by the API and the celery tasks, so workers never import the web layer
+
+def encode_raw(data: EncodeRequest, executor: Optional[Executor] = None) -> Tuple[bytes, dict]:
+    # executor only matters for the block container, which fans its blocks out over it
+    if data.blocks:
+        return encode_blocks(data.text, data.key, executor), {
+            "huffman_codes": None, "padding": 0, "alphabet": "char", "table_id": None, "blocks": True
+        }
+    if data.table_id:
+        static_codes, _table = static_tables.get(data.table_id)
+        encoded_bytes, codes, padding = huffman_encode_bytes(data.text.encode(), codes=static_codes)
+    elif data.alphabet == "byte":
+        encoded_bytes, codes, padding = huffman_encode_bytes(data.text.encode(), canonical=data.canonical)
+    else:
+        encoded_bytes, codes, padding = huffman_encode(data.text, canonical=data.canonical)
+    encrypted_bytes = xor_encrypt(encoded_bytes, data.key)
+    # no key in here, results get cached; they also need immutable bytes, so
+    # the buffer xor_encrypt worked in is copied exactly once, here
+    return bytes(encrypted_bytes), {
+        "huffman_codes": None if data.canonical or data.table_id else codes,
+        "padding": padding,
+        "alphabet": "byte" if data.table_id else data.alphabet,
+        "table_id": data.table_id,
+        "blocks": False
+    }
+
+def decode_raw(data: DecodeRequest, encrypted_bytes: bytes, executor: Optional[Executor] = None) -> str:
+    if data.blocks:
+        return decode_blocks(encrypted_bytes, data.key, executor)
+    decoded_bytes = xor_decrypt(encrypted_bytes, data.key)
+    if data.table_id:
+        static_codes, table = static_tables.get(data.table_id)
+        return huffman_decode_bytes(decoded_bytes, static_codes, data.padding, table).decode()
+    if data.alphabet == "byte":
+        return huffman_decode_bytes(decoded_bytes, data.huffman_codes, data.padding).decode()
+    return huffman_decode(decoded_bytes, data.huffman_codes, data.padding)
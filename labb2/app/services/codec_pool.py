@@ -0,0 +1,44 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from fastapi.concurrency import run_in_threadpool
+from app.core.metrics import collect, merge
+
+CODEC_WORKERS = int(os.getenv("CODEC_WORKERS", str(os.cpu_count() or 1)))
+CODEC_INLINE_MAX_BYTES = int(os.getenv("CODEC_INLINE_MAX_BYTES", "1024"))
+
+class CodecPool:
+    # routes codec work by payload size: trivial jobs inline on the event loop,
+    # everything else to worker processes
+    def __init__(self, workers: int, inline_max_bytes: int):
+        self.workers = workers
+        self.inline_max_bytes = inline_max_bytes
+        self.executor = None
+        self.lock = threading.Lock()
+
+    def get_executor(self) -> ProcessPoolExecutor:
+        with self.lock:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            return self.executor
+
+    async def run(self, size: int, func, *args, inline: bool = True):
+        # inline work blocks every other request and socket, so keep it to well under a millisecond
+        if inline and size <= self.inline_max_bytes:
+            return func(*args)
+        if self.workers <= 0:
+            return await run_in_threadpool(func, *args)
+        loop = asyncio.get_running_loop()
+        # stage samples and code table stats recorded in the worker come back with the result
+        result, samples = await loop.run_in_executor(self.get_executor(), collect, func, *args)
+        merge(samples)
+        return result
+
+    def shutdown(self):
+        with self.lock:
+            if self.executor is not None:
+                self.executor.shutdown(wait=False, cancel_futures=True)
+                self.executor = None
+
+codec_pool = CodecPool(CODEC_WORKERS, CODEC_INLINE_MAX_BYTES)
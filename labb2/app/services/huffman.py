@@ -1,6 +1,11 @@
 import heapq
+import struct
 from collections import Counter, namedtuple
-from typing import Dict, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from app.core.metrics import stage
+
+DECODE_TABLE_BITS = 12
 
 class Node(namedtuple("Node", ["left", "right"])):
     def walk(self, code, acc):
@@ -11,10 +16,47 @@ class Leaf(namedtuple("Leaf", ["char"])):
     def walk(self, code, acc):
         code[self.char] = acc or "0"
 
-def huffman_encode(text: str) -> Tuple[bytes, Dict[str, str], int]:
-    freq = Counter(text)
+def canonical_codes(lengths: Dict[str, int]) -> Dict[str, str]:
+    codes = {}
+    value = 0
+    prev_len = 0
+    for ch, length in sorted(lengths.items(), key=lambda item: (item[1], item[0])):
+        value <<= length - prev_len
+        codes[ch] = format(value, f'0{length}b')
+        value += 1
+        prev_len = length
+    return codes
+
+def pack_code_lengths(codes: Dict[str, str]) -> bytes:
+    # header: u32 symbol count, then the UTF-8 symbol and a u8 code length per entry
+    header = bytearray(struct.pack('>I', len(codes)))
+    for ch, c in codes.items():
+        header += ch.encode('utf-8')
+        header.append(len(c))
+    return bytes(header)
+
+def unpack_code_lengths(data: bytes) -> Tuple[Dict[str, str], int]:
+    if len(data) < 4:
+        raise ValueError("Truncated Huffman header")
+    (count,) = struct.unpack_from('>I', data)
+    pos = 4
+    lengths = {}
+    for _ in range(count):
+        if pos >= len(data):
+            raise ValueError("Truncated Huffman header")
+        lead = data[pos]
+        size = 1 if lead < 0x80 else 2 if lead < 0xE0 else 3 if lead < 0xF0 else 4
+        ch = bytes(data[pos:pos + size]).decode('utf-8')
+        pos += size
+        if pos >= len(data):
+            raise ValueError("Truncated Huffman header")
+        lengths[ch] = data[pos]
+        pos += 1
+    return canonical_codes(lengths), pos
+
+def build_codes(freq, canonical: bool = False) -> Dict[str, str]:
     heap = []
-    for ch, fr in freq.items():
+    for ch, fr in freq:
         heap.append((fr, len(heap), Leaf(ch)))
     heapq.heapify(heap)
     count = len(heap)
@@ -23,30 +65,151 @@ def huffman_encode(text: str) -> Tuple[bytes, Dict[str, str], int]:
         fr2, _c2, right = heapq.heappop(heap)
         heapq.heappush(heap, (fr1 + fr2, count, Node(left, right)))
         count += 1
+    code = {}
     if heap:
         [(_fr, _c, root)] = heap
-        code = {}
         root.walk(code, "")
-    else:
-        code = {}
-    encoded = ''.join(code[ch] for ch in text)
+    if canonical:
+        code = canonical_codes({ch: len(c) for ch, c in code.items()})
+    return code
+
+def pack_bits(encoded: str) -> Tuple[bytes, int]:
     padding = (8 - len(encoded) % 8) % 8
-    encoded += '0' * padding
-    b = bytearray()
-    for i in range(0, len(encoded), 8):
-        b.append(int(encoded[i:i+8], 2))
-    return bytes(b), code, padding
-
-def huffman_decode(data: bytes, codes: Dict[str, str], padding: int) -> str:
-    inv_codes = {v: k for k, v in codes.items()}
-    bits = ''.join(f'{byte:08b}' for byte in data)
-    if padding:
-        bits = bits[:-padding]
-    res = []
-    code = ''
-    for bit in bits:
-        code += bit
-        if code in inv_codes:
-            res.append(inv_codes[code])
-            code = ''
-    return ''.join(res) 
\ No newline at end of file
+    if not encoded:
+        return b'', 0
+    return int(encoded + '0' * padding, 2).to_bytes((len(encoded) + padding) // 8, 'big'), padding
+
+def huffman_encode(text: str, canonical: bool = False) -> Tuple[bytes, Dict[str, str], int]:
+    with stage("huffman.frequency", len(text)):
+        counts = Counter(text)
+    with stage("huffman.tree"):
+        code = build_codes(counts.items(), canonical)
+    with stage("huffman.pack", len(text)) as timer:
+        data, padding = pack_bits(''.join(code[ch] for ch in text))
+        if canonical:
+            data = pack_code_lengths(code) + data
+        timer.bytes_out = len(data)
+    return data, code, padding
+
+def byte_counts(data: bytes) -> List[int]:
+    counts = [0] * 256
+    for b in set(data):
+        counts[b] = data.count(b)
+    return counts
+
+def huffman_encode_bytes(data: bytes, canonical: bool = False, codes: Optional[Dict[str, str]] = None) -> Tuple[bytes, Dict[str, str], int]:
+    # fixed 256-symbol alphabet, byte b is keyed as chr(b) so the tables and header are shared with text mode
+    # codes given by the caller (pre-trained tables) are used as-is and never written to a header
+    if codes is None:
+        with stage("huffman.frequency", len(data)):
+            counts = byte_counts(data)
+        with stage("huffman.tree"):
+            code = build_codes(((chr(b), n) for b, n in enumerate(counts) if n), canonical)
+    else:
+        code = codes
+        canonical = False
+    with stage("huffman.pack", len(data)) as timer:
+        table = [code.get(chr(b), '') for b in range(256)]
+        packed, padding = pack_bits(''.join(map(table.__getitem__, data)))
+        if canonical:
+            packed = pack_code_lengths(code) + packed
+        timer.bytes_out = len(packed)
+    return packed, code, padding
+
+def _fill_table(entries: List[Tuple[int, int, str]], width: int) -> Tuple[int, list]:
+    # entries are (value, length, char) with codes relative to this level
+    table = [None] * (1 << width)
+    longer = {}
+    for value, length, ch in entries:
+        if length <= width:
+            shift = width - length
+            start = value << shift
+            slot = (ch, length, ch, length)
+            for i in range(start, start + (1 << shift)):
+                table[i] = slot
+        else:
+            rest = length - width
+            longer.setdefault(value >> rest, []).append((value & ((1 << rest) - 1), rest, ch))
+    for prefix, sub in longer.items():
+        sub_width = min(max(length for _v, length, _c in sub), DECODE_TABLE_BITS)
+        table[prefix] = (_fill_table(sub, sub_width), 0, None, 0)
+    return width, table
+
+def _pack_table(width: int, table: list) -> list:
+    # let each slot of the root table emit every symbol that fits in its bits
+    packed = [None] * len(table)
+    for i, slot in enumerate(table):
+        if slot is None or slot[1] == 0:
+            packed[i] = slot
+            continue
+        chars = [slot[0]]
+        used = slot[1]
+        while True:
+            rest = width - used
+            nxt = table[(i << used) & ((1 << width) - 1)] if rest else None
+            if nxt is None or nxt[1] == 0 or nxt[1] > rest:
+                break
+            chars.append(nxt[0])
+            used += nxt[1]
+        packed[i] = (''.join(chars), used, slot[0], slot[1])
+    return packed
+
+def build_decode_table(codes: Dict[str, str]) -> Tuple[int, list]:
+    entries = [(int(c, 2), len(c), ch) for ch, c in codes.items()]
+    if not entries:
+        return 0, [None]
+    width, table = _fill_table(entries, DECODE_TABLE_BITS)
+    return width, _pack_table(width, table)
+
+def huffman_decode(data: bytes, codes: Optional[Dict[str, str]], padding: int, decode_table: Optional[Tuple[int, list]] = None) -> str:
+    if codes is None:
+        codes, offset = unpack_code_lengths(data)
+        data = data[offset:]
+    if not codes or not data:
+        return ''
+    if decode_table is None:
+        with stage("huffman.decode_table"):
+            decode_table = build_decode_table(codes)
+    root_width, root = decode_table
+    total = len(data) * 8 - padding
+    min_len = min(len(c) for c in codes.values())
+    res = [None] * (total // min_len + 1)
+    n = 0
+    acc = 0
+    nbits = 0
+    pos = 0
+    width, table = root_width, root
+    while total > 0:
+        if nbits < width:
+            chunk = data[pos:pos + 8]
+            pos += 8
+            acc = (acc << 64) | int.from_bytes(chunk.ljust(8, b'\0'), 'big')
+            nbits += 64
+        nbits -= width
+        slot = table[acc >> nbits]
+        if slot is None:
+            raise ValueError("Invalid Huffman code in data")
+        chars, length = slot[0], slot[1]
+        if length == 0:
+            if total < width:
+                break
+            acc &= (1 << nbits) - 1
+            total -= width
+            width, table = chars
+            continue
+        if length > total:
+            chars, length = slot[2], slot[3]
+            if length > total:
+                break
+        nbits += width - length
+        acc &= (1 << nbits) - 1
+        total -= length
+        res[n] = chars
+        n += 1
+        if table is not root:
+            width, table = root_width, root
+    del res[n:]
+    return ''.join(res)
+
+def huffman_decode_bytes(data: bytes, codes: Optional[Dict[str, str]], padding: int, decode_table: Optional[Tuple[int, list]] = None) -> bytes:
+    return huffman_decode(data, codes, padding, decode_table).encode('latin-1')
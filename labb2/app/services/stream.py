@@ -0,0 +1,108 @@
+import codecs
+import struct
+from typing import Optional, Tuple
+
+from app.services.huffman import huffman_encode, huffman_decode
+from app.services.xor_cipher import xor_into
+
+STREAM_BLOCK_CHARS = 1 << 20
+MAX_FRAME_SIZE = 64 * STREAM_BLOCK_CHARS
+FRAME_HEADER = struct.Struct('>IB')
+
+# the responses of /encode-stream and /decode-stream are records: u8 kind, u32
+# length, payload. "D" records carry the output, and the body always ends with
+# one "F" (finished) or one "E" (payload is the UTF-8 error message), so an error
+# or a cut connection can never pass for output
+RECORD_HEADER = struct.Struct('>cI')
+RECORD_DATA = b'D'
+RECORD_END = b'F'
+RECORD_ERROR = b'E'
+
+def record(kind: bytes, payload: bytes = b'') -> bytes:
+    return RECORD_HEADER.pack(kind, len(payload)) + payload
+
+def read_records(body: bytes) -> Tuple[bytes, Optional[str]]:
+    # client side: returns the joined output and the error the server reported, if any
+    out = bytearray()
+    pos = 0
+    while pos + RECORD_HEADER.size <= len(body):
+        kind, size = RECORD_HEADER.unpack_from(body, pos)
+        pos += RECORD_HEADER.size
+        payload = body[pos:pos + size]
+        pos += size
+        if len(payload) < size:
+            break
+        if kind == RECORD_DATA:
+            out += payload
+        elif kind == RECORD_END:
+            return bytes(out), None
+        elif kind == RECORD_ERROR:
+            return bytes(out), payload.decode()
+        else:
+            raise ValueError(f"Unknown record kind: {kind!r}")
+    raise ValueError("Stream ended without an end record")
+
+class StreamEncoder:
+    # frames are u32 length + u8 padding + canonical Huffman block, the whole stream is XORed
+    def __init__(self, key: str, block_chars: int = STREAM_BLOCK_CHARS):
+        if not key:
+            raise ValueError("Key must not be empty")
+        self.key = key.encode()
+        self.block_chars = block_chars
+        self.offset = 0
+        self.text = ''
+        self.utf8 = codecs.getincrementaldecoder('utf-8')()
+
+    def _frame(self, text: str) -> bytes:
+        data, _codes, padding = huffman_encode(text, canonical=True)
+        frame = bytearray(FRAME_HEADER.pack(len(data), padding))
+        frame += data
+        xor_into(frame, self.key, self.offset)
+        self.offset += len(frame)
+        return frame
+
+    def feed(self, chunk: bytes) -> bytes:
+        self.text += self.utf8.decode(chunk)
+        out = bytearray()
+        while len(self.text) >= self.block_chars:
+            out += self._frame(self.text[:self.block_chars])
+            self.text = self.text[self.block_chars:]
+        return bytes(out)
+
+    def finish(self) -> bytes:
+        self.text += self.utf8.decode(b'', final=True)
+        out = self._frame(self.text) if self.text else b''
+        self.text = ''
+        return bytes(out)
+
+class StreamDecoder:
+    def __init__(self, key: str):
+        if not key:
+            raise ValueError("Key must not be empty")
+        self.key = key.encode()
+        self.offset = 0
+        self.buffer = bytearray()
+        self.frames = 0
+
+    def feed(self, chunk: bytes) -> str:
+        data = bytearray(chunk)
+        xor_into(data, self.key, self.offset)
+        self.offset += len(data)
+        self.buffer += data
+        res = []
+        while len(self.buffer) >= FRAME_HEADER.size:
+            size, padding = FRAME_HEADER.unpack_from(self.buffer)
+            if size > MAX_FRAME_SIZE:
+                raise ValueError("Frame too large")
+            end = FRAME_HEADER.size + size
+            if len(self.buffer) < end:
+                break
+            res.append(huffman_decode(bytes(self.buffer[FRAME_HEADER.size:end]), None, padding))
+            del self.buffer[:end]
+            self.frames += 1
+        return ''.join(res)
+
+    def finish(self) -> str:
+        if self.buffer:
+            raise ValueError("Truncated stream")
+        return ''
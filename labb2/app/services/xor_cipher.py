@@ -1,6 +1,33 @@
-def xor_encrypt(data: bytes, key: str) -> bytes:
-    key_bytes = key.encode()
-    return bytes([b ^ key_bytes[i % len(key_bytes)] for i, b in enumerate(data)])
+from typing import Union
+from app.core.metrics import stage
 
-def xor_decrypt(data: bytes, key: str) -> bytes:
-    return xor_encrypt(data, key)
\ No newline at end of file
+XOR_BLOCK_SIZE = 1 << 16
+
+def xor_into(buf, key_bytes: bytes, offset: int = 0) -> None:
+    if not key_bytes:
+        raise ValueError("Key must not be empty")
+    view = memoryview(buf).cast('B')
+    size = len(view)
+    if not size:
+        return
+    klen = len(key_bytes)
+    start = offset % klen
+    rotated = key_bytes[start:] + key_bytes[:start]
+    block = min(size, klen * max(1, XOR_BLOCK_SIZE // klen))
+    tiled = (rotated * (block // klen + 1))[:block]
+    key_int = int.from_bytes(tiled, 'big')
+    for pos in range(0, size, block):
+        chunk = view[pos:pos + block]
+        n = len(chunk)
+        k = key_int if n == block else int.from_bytes(tiled[:n], 'big')
+        chunk[:] = (int.from_bytes(chunk, 'big') ^ k).to_bytes(n, 'big')
+
+def xor_encrypt(data: Union[bytes, bytearray], key: str) -> bytearray:
+    # a bytearray from the caller is XORed in place and handed back, bytes are copied once
+    with stage("xor", len(data)):
+        buf = data if isinstance(data, bytearray) else bytearray(data)
+        xor_into(buf, key.encode())
+        return buf
+
+def xor_decrypt(data: Union[bytes, bytearray], key: str) -> bytearray:
+    return xor_encrypt(data, key)
@@ -0,0 +1,174 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Optional, Tuple
+
+TASK_EVENTS_BACKEND = os.getenv("TASK_EVENTS_BACKEND", "redis")
+TASK_EVENTS_URL = os.getenv("TASK_EVENTS_URL", os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+CHANNEL_PREFIX = "task-events:"
+# how long a reader waits for a message before checking it still has subscriptions
+POLL_TIMEOUT = 1.0
+
+class RedisTransport:
+    # one channel per task, so an API process only receives events for the
+    # tasks it has sockets open for, however many processes there are
+    def __init__(self, url: str):
+        self.url = url
+        self.client = None
+        self.pid = None
+        self.pubsub = None
+
+    def publish(self, channel: str, payload: str) -> int:
+        # prefork workers must not share the parent's connection
+        if self.client is None or self.pid != os.getpid():
+            import redis
+            self.client = redis.Redis.from_url(self.url)
+            self.pid = os.getpid()
+        return self.client.publish(channel, payload)
+
+    def get_pubsub(self):
+        if self.pubsub is None:
+            import redis.asyncio
+            self.pubsub = redis.asyncio.Redis.from_url(self.url).pubsub(ignore_subscribe_messages=True)
+        return self.pubsub
+
+    async def subscribe(self, channel: str):
+        await self.get_pubsub().subscribe(channel)
+
+    async def unsubscribe(self, channel: str):
+        await self.get_pubsub().unsubscribe(channel)
+
+    async def get_message(self) -> Optional[Tuple[str, str]]:
+        message = await self.get_pubsub().get_message(timeout=POLL_TIMEOUT)
+        if message is None or message["type"] != "message":
+            return None
+        return message["channel"].decode(), message["data"].decode()
+
+    async def close(self):
+        if self.pubsub is not None:
+            await self.pubsub.close()
+            self.pubsub = None
+
+class MemoryTransport:
+    # stand-in for a single process (tests, eager Celery): publishers may run on
+    # any thread, messages are handed to the subscribing event loop
+    def __init__(self):
+        self.channels = set()
+        self.loop = None
+        self.queue = None
+        self.lock = threading.Lock()
+
+    def publish(self, channel: str, payload: str) -> int:
+        with self.lock:
+            if channel not in self.channels:
+                return 0
+            loop, queue = self.loop, self.queue
+        loop.call_soon_threadsafe(queue.put_nowait, (channel, payload))
+        return 1
+
+    async def subscribe(self, channel: str):
+        with self.lock:
+            if self.queue is None:
+                self.loop = asyncio.get_running_loop()
+                self.queue = asyncio.Queue()
+            self.channels.add(channel)
+
+    async def unsubscribe(self, channel: str):
+        with self.lock:
+            self.channels.discard(channel)
+
+    async def get_message(self) -> Optional[Tuple[str, str]]:
+        try:
+            return await asyncio.wait_for(self.queue.get(), POLL_TIMEOUT)
+        except asyncio.TimeoutError:
+            return None
+
+    async def close(self):
+        pass
+
+class TaskEventBridge:
+    # workers publish task events; each API process subscribes to the tasks its
+    # sockets watch and hands the events to the local ConnectionManager
+    def __init__(self, transport, deliver):
+        self.transport = transport
+        self.deliver = deliver
+        self.refs = {}
+        self.lock = asyncio.Lock()
+        self.reader = None
+        self.active = None
+        self.published = 0
+        self.publish_errors = 0
+        self.delivered = 0
+
+    def publish(self, task_id: str, message: dict):
+        # progress is best effort, a broker hiccup must not fail the task
+        try:
+            self.transport.publish(CHANNEL_PREFIX + task_id, json.dumps(message))
+            self.published += 1
+        except Exception:
+            self.publish_errors += 1
+            logging.warning("could not publish event for task %s", task_id, exc_info=True)
+
+    async def subscribe(self, task_id: str):
+        # serialized so a socket never counts on a subscribe that is still in
+        # flight, and a failed one leaves no reference behind
+        async with self.lock:
+            if task_id not in self.refs:
+                await self.transport.subscribe(CHANNEL_PREFIX + task_id)
+            self.refs[task_id] = self.refs.get(task_id, 0) + 1
+            if self.reader is None:
+                self.active = asyncio.Event()
+                self.reader = asyncio.create_task(self.read())
+            self.active.set()
+
+    async def unsubscribe(self, task_id: str):
+        async with self.lock:
+            count = self.refs.pop(task_id, 0) - 1
+            if count > 0:
+                self.refs[task_id] = count
+                return
+            if not self.refs:
+                self.active.clear()
+            await self.transport.unsubscribe(CHANNEL_PREFIX + task_id)
+
+    async def read(self):
+        while True:
+            await self.active.wait()
+            try:
+                item = await self.transport.get_message()
+            except Exception:
+                logging.warning("task event subscription failed, retrying", exc_info=True)
+                await asyncio.sleep(POLL_TIMEOUT)
+                continue
+            if item is None:
+                continue
+            channel, payload = item
+            try:
+                await self.deliver(channel[len(CHANNEL_PREFIX):], json.loads(payload))
+                self.delivered += 1
+            except Exception:
+                logging.warning("could not deliver event on %s", channel, exc_info=True)
+
+    async def stop(self):
+        if self.reader is not None:
+            self.reader.cancel()
+            try:
+                await self.reader
+            except asyncio.CancelledError:
+                pass
+            self.reader = None
+        await self.transport.close()
+
+def make_transport():
+    if TASK_EVENTS_BACKEND == "memory":
+        return MemoryTransport()
+    return RedisTransport(TASK_EVENTS_URL)
+
+async def send_to_sockets(task_id: str, message: dict):
+    # imported here so celery workers, which only publish, never load FastAPI
+    from app.websocket.manager import manager
+    await manager.send_json(task_id, message)
+
+task_events = TaskEventBridge(make_transport(), send_to_sockets)
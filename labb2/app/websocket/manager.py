@@ -1,21 +1,146 @@
-from typing import Dict
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from typing import Dict, Set
 from fastapi import WebSocket
 
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "32"))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", "5"))
+WS_SLOW_SECONDS = float(os.getenv("WS_SLOW_SECONDS", "10"))
+# "try again later", sent to consumers that cannot keep up
+SLOW_CLOSE_CODE = 1013
+
+class Connection:
+    # one socket with its own bounded queue and writer task, so a slow reader
+    # only ever delays itself
+    def __init__(self, websocket: WebSocket, queue_size: int):
+        self.websocket = websocket
+        self.queue_size = queue_size
+        self.queue = deque()
+        self.ready = asyncio.Event()
+        self.full_since = None
+        self.sending_since = None
+        self.closed = False
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.writer = None
+
+    def put(self, status: str, text: str) -> bool:
+        # returns False once the consumer has been too slow for too long:
+        # a single send stuck past WS_SEND_TIMEOUT, or a full queue for WS_SLOW_SECONDS
+        now = time.monotonic()
+        if self.sending_since is not None and now - self.sending_since > WS_SEND_TIMEOUT:
+            return False
+        if len(self.queue) < self.queue_size:
+            self.queue.append((status, text))
+            self.full_since = None
+            self.ready.set()
+            return True
+        if self.full_since is None:
+            self.full_since = now
+        elif now - self.full_since > WS_SLOW_SECONDS:
+            return False
+        # progress is a running value, only the newest one matters; other
+        # statuses are kept and push out the oldest progress update instead
+        if status == "PROGRESS":
+            for i in range(len(self.queue) - 1, -1, -1):
+                if self.queue[i][0] == "PROGRESS":
+                    self.queue[i] = (status, text)
+                    self.coalesced += 1
+                    return True
+            self.dropped += 1
+            return True
+        for i, (queued, _) in enumerate(self.queue):
+            if queued == "PROGRESS":
+                del self.queue[i]
+                self.queue.append((status, text))
+                self.dropped += 1
+                return True
+        return False
+
+    async def write(self):
+        while True:
+            await self.ready.wait()
+            while self.queue:
+                _, text = self.queue.popleft()
+                # checked by put() rather than wrapping every send in wait_for
+                self.sending_since = time.monotonic()
+                await self.websocket.send_text(text)
+                self.sending_since = None
+                self.sent += 1
+            self.ready.clear()
+
 class ConnectionManager:
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+    def __init__(self, queue_size: int = WS_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self.active_connections: Dict[str, Set[Connection]] = {}
+        self.slow_disconnects = 0
+        self.coalesced = 0
+        self.dropped = 0
 
-    async def connect(self, task_id: str, websocket: WebSocket):
+    async def connect(self, task_id: str, websocket: WebSocket) -> Connection:
         await websocket.accept()
-        self.active_connections[task_id] = websocket
+        connection = Connection(websocket, self.queue_size)
+        connection.writer = asyncio.create_task(self.run_writer(task_id, connection))
+        self.active_connections.setdefault(task_id, set()).add(connection)
+        return connection
 
-    def disconnect(self, task_id: str):
-        if task_id in self.active_connections:
-            del self.active_connections[task_id]
+    def disconnect(self, task_id: str, connection: Connection):
+        if connection.closed:
+            return
+        connection.closed = True
+        self.coalesced += connection.coalesced
+        self.dropped += connection.dropped
+        connections = self.active_connections.get(task_id)
+        if connections is not None:
+            connections.discard(connection)
+            if not connections:
+                del self.active_connections[task_id]
+        if connection.writer is not None and connection.writer is not asyncio.current_task():
+            connection.writer.cancel()
+
+    async def run_writer(self, task_id: str, connection: Connection):
+        try:
+            await connection.write()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # the socket is gone
+            await self.close_slow(task_id, connection)
+
+    async def close_slow(self, task_id: str, connection: Connection):
+        if connection.closed:
+            return
+        self.disconnect(task_id, connection)
+        self.slow_disconnects += 1
+        try:
+            await connection.websocket.close(code=SLOW_CLOSE_CODE)
+        except Exception:
+            pass
 
     async def send_json(self, task_id: str, message: dict):
-        websocket = self.active_connections.get(task_id)
-        if websocket:
-            await websocket.send_json(message)
+        # serialized once and queued for every viewer; never waits on a socket
+        connections = self.active_connections.get(task_id)
+        if not connections:
+            return
+        text = json.dumps(message)
+        status = message.get("status")
+        for connection in list(connections):
+            if not connection.put(status, text):
+                asyncio.create_task(self.close_slow(task_id, connection))
+
+    def stats(self) -> dict:
+        connections = [c for group in self.active_connections.values() for c in group]
+        return {
+            "tasks": len(self.active_connections),
+            "connections": len(connections),
+            "queued": sum(len(c.queue) for c in connections),
+            "coalesced": self.coalesced + sum(c.coalesced for c in connections),
+            "dropped": self.dropped + sum(c.dropped for c in connections),
+            "slow_disconnects": self.slow_disconnects,
+        }
 
-manager = ConnectionManager() 
\ No newline at end of file
+manager = ConnectionManager()
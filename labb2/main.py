@@ -1,24 +1,59 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, ORJSONResponse
 from app.db.base import Base
 from app.db.session import engine
+from app.core.hashing import HashingOverloaded
+from app.core.metrics import METRICS_ENABLED, MetricsMiddleware
+from app.services.codec_pool import codec_pool
+from app.api.auth import router as auth_router
+from app.api.crypto import router as crypto_router
+from app.api.ws import router as ws_router
+from app.api.metrics import router as metrics_router
+from app.api.blobs import router as blobs_router
+from app.websocket.bridge import task_events
 import traceback
 
-Base.metadata.create_all(bind=engine)
+def create_app() -> FastAPI:
+    # importing this module only builds the app; the database is touched at startup
+    # and Celery on the first async request
+    app = FastAPI(default_response_class=ORJSONResponse)
 
-app = FastAPI()
+    app.include_router(auth_router)
+    app.include_router(crypto_router)
+    app.include_router(ws_router)
+    app.include_router(metrics_router)
+    app.include_router(blobs_router)
 
-from app.api.auth import router as auth_router
-from app.api.crypto import router as crypto_router
-from app.api.ws import router as ws_router
+    if METRICS_ENABLED:
+        app.add_middleware(MetricsMiddleware)
+
+    @app.on_event("startup")
+    def create_schema():
+        Base.metadata.create_all(bind=engine)
+
+    @app.on_event("shutdown")
+    def shutdown_codec_pool():
+        codec_pool.shutdown()
+
+    @app.on_event("shutdown")
+    async def stop_task_events():
+        await task_events.stop()
+
+    @app.exception_handler(HashingOverloaded)
+    async def hashing_overloaded_handler(request: Request, exc: HashingOverloaded):
+        return JSONResponse(
+            status_code=503,
+            content={"error": str(exc)},
+            headers={"Retry-After": "1"},
+        )
+
+    @app.exception_handler(Exception)
+    async def global_exception_handler(request: Request, exc: Exception):
+        return JSONResponse(
+            status_code=500,
+            content={"error": str(exc), "traceback": traceback.format_exc()},
+        )
 
-app.include_router(auth_router)
-app.include_router(crypto_router)
-app.include_router(ws_router)
+    return app
 
-@app.exception_handler(Exception)
-async def global_exception_handler(request: Request, exc: Exception):
-    return JSONResponse(
-        status_code=500,
-        content={"error": str(exc), "traceback": traceback.format_exc()},
-    ) 
\ No newline at end of file
+app = create_app()
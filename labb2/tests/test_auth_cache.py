@@ -0,0 +1,37 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from app.core.auth_cache import PrincipalCache, principal_cache
+from app.db.base import Base
+from app.models.user import User
+from app.schemas.user import UserMe
+
+def make_session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)()
+
+def test_expired_entries_are_dropped():
+    cache = PrincipalCache(maxsize=10, ttl=300)
+    cache.put("token", UserMe(id=1, email="a@example.com"), exp=0)
+    assert cache.get("token") is None
+
+def test_user_update_and_delete_drop_cached_principals():
+    db = make_session()
+    user = User(email="old@example.com", hashed_password="x")
+    db.add(user)
+    db.commit()
+    principal_cache.clear()
+    principal_cache.put("t1", UserMe.from_orm(user))
+    principal_cache.put("t2", UserMe(id=99, email="other@example.com"))
+
+    user.email = "new@example.com"
+    db.commit()
+    assert principal_cache.get("t1") is None
+    assert principal_cache.get("t2") is not None
+
+    principal_cache.put("t3", UserMe.from_orm(user))
+    db.delete(user)
+    db.commit()
+    assert principal_cache.get("t3") is None
+    principal_cache.clear()
@@ -0,0 +1,25 @@
+import pytest
+
+from app.services.blocks import BLOCK_MAGIC, decode_blocks, encode_blocks, split_blocks
+
+def test_round_trip_over_many_blocks():
+    text = "блоки и ключи " * 1000
+    data = encode_blocks(text, "secret", block_chars=1000)
+    assert len(split_blocks(data)) > 1
+    assert decode_blocks(data, "secret") == text
+
+def test_blocks_continue_the_keystream():
+    # two equal blocks whose sizes are not a multiple of the key length
+    data = encode_blocks("abcabcabcd" * 2, "key", block_chars=10)
+    first, second = split_blocks(data)
+    assert first == split_blocks(encode_blocks("abcabcabcd", "key"))[0]
+    assert second != first
+
+@pytest.mark.parametrize("data, message", [
+    (b"", "Not a block-framed container"),
+    (BLOCK_MAGIC, "Truncated block header"),
+    (BLOCK_MAGIC + b"\x00\x00\x00\x02", "Truncated block index"),
+])
+def test_malformed_containers_raise_value_error(data, message):
+    with pytest.raises(ValueError, match=message):
+        decode_blocks(data, "key")
@@ -0,0 +1,98 @@
+import asyncio
+
+import pytest
+
+from app.websocket.bridge import CHANNEL_PREFIX, MemoryTransport, TaskEventBridge
+
+class FlakyTransport(MemoryTransport):
+    def __init__(self, failures: int):
+        super().__init__()
+        self.failures = failures
+
+    async def subscribe(self, channel: str):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("broker down")
+        await super().subscribe(channel)
+
+def make_bridge(transport):
+    delivered = []
+
+    async def deliver(task_id, message):
+        delivered.append((task_id, message))
+
+    return TaskEventBridge(transport, deliver), delivered
+
+async def wait_for(delivered, count):
+    for _ in range(100):
+        if len(delivered) >= count:
+            return
+        await asyncio.sleep(0.01)
+
+def test_events_reach_subscribers_until_last_unsubscribe():
+    async def scenario():
+        transport = MemoryTransport()
+        bridge, delivered = make_bridge(transport)
+        await bridge.subscribe("t1")
+        await bridge.subscribe("t1")
+        bridge.publish("t1", {"status": "PROGRESS"})
+        bridge.publish("t2", {"status": "PROGRESS"})
+        await wait_for(delivered, 1)
+        assert delivered == [("t1", {"status": "PROGRESS"})]
+        await bridge.unsubscribe("t1")
+        assert CHANNEL_PREFIX + "t1" in transport.channels
+        await bridge.unsubscribe("t1")
+        assert transport.channels == set()
+        assert bridge.refs == {}
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+def test_failed_subscribe_leaves_no_reference():
+    async def scenario():
+        transport = FlakyTransport(failures=1)
+        bridge, delivered = make_bridge(transport)
+        with pytest.raises(ConnectionError):
+            await bridge.subscribe("t1")
+        assert bridge.refs == {}
+        # the next viewer subscribes for real instead of trusting a stale count
+        await bridge.subscribe("t1")
+        assert CHANNEL_PREFIX + "t1" in transport.channels
+        bridge.publish("t1", {"status": "COMPLETED"})
+        await wait_for(delivered, 1)
+        assert delivered == [("t1", {"status": "COMPLETED"})]
+        await bridge.unsubscribe("t1")
+        assert bridge.refs == {}
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+def test_concurrent_subscriber_retries_after_failure():
+    async def scenario():
+        transport = FlakyTransport(failures=1)
+        bridge, _ = make_bridge(transport)
+        results = await asyncio.gather(bridge.subscribe("t1"), bridge.subscribe("t1"), return_exceptions=True)
+        assert isinstance(results[0], ConnectionError)
+        assert results[1] is None
+        assert bridge.refs == {"t1": 1}
+        assert CHANNEL_PREFIX + "t1" in transport.channels
+        await bridge.stop()
+
+    asyncio.run(scenario())
+
+def test_socket_is_released_when_subscribe_fails(monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+    from app.api import ws
+    from app.websocket.manager import manager
+
+    bridge, _ = make_bridge(FlakyTransport(failures=1))
+    monkeypatch.setattr(ws, "task_events", bridge)
+    app = FastAPI()
+    app.include_router(ws.router)
+    with TestClient(app) as client:
+        with pytest.raises(ConnectionError):
+            with client.websocket_connect("/ws/t1") as socket:
+                socket.receive_text()
+    assert "t1" not in manager.active_connections
+    assert bridge.refs == {}
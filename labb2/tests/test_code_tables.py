@@ -0,0 +1,17 @@
+from app.core.metrics import collect, merge
+from app.services.code_tables import StaticTables, static_tables
+
+def test_hits_and_misses():
+    tables = StaticTables({"t": "abc"})
+    tables.get("t")
+    tables.get("t")
+    assert tables.stats() == {"hits": 1, "misses": 1, "hit_rate": 0.5}
+
+def test_worker_counts_come_back_through_collect():
+    before = static_tables.stats()
+    # what a codec worker does around a job, and what the app does with the samples
+    _result, samples = collect(static_tables.get, "json")
+    assert static_tables.stats()["hits"] + static_tables.stats()["misses"] == 0
+    merge(samples)
+    after = static_tables.stats()
+    assert after["hits"] + after["misses"] == before["hits"] + before["misses"] + 1
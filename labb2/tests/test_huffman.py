@@ -0,0 +1,53 @@
+import random
+
+import pytest
+
+from app.services.huffman import (
+    DECODE_TABLE_BITS, huffman_encode, huffman_decode, huffman_encode_bytes, huffman_decode_bytes, unpack_code_lengths
+)
+
+TEXTS = ["abracadabra", "привет, мир", ''.join(random.Random(0).choices("abcdefgh ", k=5000))]
+
+def fibonacci_text(symbols: int) -> str:
+    # fibonacci frequencies give the deepest possible tree, one level per symbol
+    counts = [1, 1]
+    while len(counts) < symbols:
+        counts.append(counts[-1] + counts[-2])
+    return ''.join(chr(0x41 + i) * n for i, n in enumerate(counts))
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_round_trip(text):
+    data, codes, padding = huffman_encode(text)
+    assert huffman_decode(data, codes, padding) == text
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_canonical_round_trip_reads_codes_from_header(text):
+    data, codes, padding = huffman_encode(text, canonical=True)
+    header_codes, offset = unpack_code_lengths(data)
+    assert header_codes == codes
+    # the header carries the codes, the caller passes none
+    assert huffman_decode(data, None, padding) == text
+    assert huffman_decode(data[offset:], codes, padding) == text
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_codes_longer_than_the_decode_table(canonical):
+    text = fibonacci_text(20)
+    data, codes, padding = huffman_encode(text, canonical=canonical)
+    assert max(len(c) for c in codes.values()) > DECODE_TABLE_BITS
+    assert huffman_decode(data, None if canonical else codes, padding) == text
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_single_symbol_alphabet(canonical):
+    data, codes, padding = huffman_encode("zzzzzzz", canonical=canonical)
+    assert codes == {"z": "0"}
+    assert huffman_decode(data, None if canonical else codes, padding) == "zzzzzzz"
+
+@pytest.mark.parametrize("canonical", [False, True])
+def test_byte_alphabet(canonical):
+    data = bytes(range(256)) + "байты".encode() + b"\x00" * 100
+    encoded, codes, padding = huffman_encode_bytes(data, canonical=canonical)
+    assert huffman_decode_bytes(encoded, None if canonical else codes, padding) == data
+
+def test_empty_input():
+    data, codes, padding = huffman_encode("")
+    assert huffman_decode(data, codes, padding) == ""
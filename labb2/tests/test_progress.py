@@ -0,0 +1,23 @@
+from app.celery.progress import ProgressReporter
+
+def make_reporter(**kwargs):
+    states = []
+    reporter = ProgressReporter(lambda state, meta: states.append(meta.get("progress")), lambda message: None,
+                                "encode", **kwargs)
+    reporter.start()
+    return reporter, states
+
+def test_fast_task_sends_every_min_delta():
+    # all reports land inside min_interval, the percent steps alone let them through
+    reporter, states = make_reporter(min_interval=3600, min_delta=10)
+    for done in range(1, 101):
+        reporter.progress(done, 100)
+    assert states == [None, 10, 20, 30, 40, 50, 60, 70, 80, 90]
+
+def test_slow_task_ticks_after_min_interval():
+    # a small step still goes out once min_interval has passed
+    reporter, states = make_reporter(min_interval=0, min_delta=50)
+    reporter.progress(1, 100)
+    reporter.progress(1, 100)
+    reporter.progress(2, 100)
+    assert states == [None, 1, 2]
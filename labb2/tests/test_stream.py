@@ -0,0 +1,63 @@
+import asyncio
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import crypto
+from app.services.stream import StreamEncoder, read_records
+
+app = FastAPI()
+app.include_router(crypto.router)
+client = TestClient(app)
+
+def chunks(data: bytes, size: int = 700):
+    for i in range(0, len(data), size):
+        yield data[i:i + size]
+
+def encoded(text: str) -> bytes:
+    encoder = StreamEncoder("k", block_chars=1000)
+    return encoder.feed(text.encode()) + encoder.finish()
+
+def test_decode_stream_round_trip():
+    text = "привет мир " * 500
+    r = client.post("/decode-stream?key=k", content=chunks(encoded(text)))
+    assert r.status_code == 200
+    assert read_records(r.content) == (text.encode(), None)
+
+def test_decode_stream_failure_after_first_frame_is_an_error_record():
+    text = "привет мир " * 500
+    r = client.post("/decode-stream?key=k", content=chunks(encoded(text)[:-10]))
+    assert r.status_code == 200
+    out, error = read_records(r.content)
+    assert error == "Truncated stream"
+    assert text.encode().startswith(out)
+
+def test_decode_stream_bad_first_frame_is_400():
+    r = client.post("/decode-stream?key=k", content=b"abc")
+    assert r.status_code == 400
+
+def test_encode_stream_round_trip():
+    text = "поток " * 300
+    r = client.post("/encode-stream?key=k", content=chunks(text.encode()))
+    assert r.status_code == 200
+    data, error = read_records(r.content)
+    assert error is None
+    r = client.post("/decode-stream?key=k", content=data)
+    assert read_records(r.content) == (text.encode(), None)
+
+def test_encode_stream_invalid_utf8_in_first_chunk_is_400():
+    r = client.post("/encode-stream?key=k", content=b"\xff")
+    assert r.status_code == 400
+
+def test_encode_stream_invalid_utf8_later_is_an_error_record():
+    # the test client sends the body in one piece, so drive the response body directly
+    async def rest():
+        yield b"\xff\xfe"
+
+    async def body() -> bytes:
+        encoder = StreamEncoder("k")
+        records = crypto.stream_records(encoder.feed(b"abc"), rest(), encoder.feed, encoder.finish, "/encode-stream")
+        return b"".join([r async for r in records])
+
+    _data, error = read_records(asyncio.run(body()))
+    assert "utf-8" in error